@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Queryable SQLite database of the analysis results.
+
+One local database holds every store's files (size and content hash), the
+Liquid render references and the feature pattern matches, with indexes for
+the questions the JSON snapshots used to answer by loading everything:
+"which files are identical in exactly 4 stores", "who renders this snippet",
+"where is the enquiry system referenced". Syncs compare against what is
+already stored and only write rows that were added, changed or removed.
+
+Files are kept once per hash kind (full SHA-256, git blob SHA or tiered
+content key, see file_index), so analyzers that index with different kinds
+each keep their own rows instead of rewriting each other's.
+
+Usage: python analysis_db.py [--git] [--identical N] [--users PATH] [--feature NAME]
+                             [--hash-kind KIND]
+"""
+
+import os
+import sys
+import sqlite3
+
+from file_index import HASH_CONTENT_KEY, HASH_GIT_BLOB, HASH_SHA256, SHARED, STORES, build_index
+from liquid_graph import build_liquid_graph
+
+ANALYSIS_DB_PATH = os.path.join('.analysis-cache', 'analysis.db')
+# Queries default to the most exact hash kind that has been synced
+HASH_KIND_PREFERENCE = [HASH_SHA256, HASH_GIT_BLOB, HASH_CONTENT_KEY]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    name TEXT PRIMARY KEY,
+    is_shared INTEGER NOT NULL,
+    file_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    store TEXT NOT NULL,
+    path TEXT NOT NULL,
+    hash_kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT,
+    in_shared INTEGER NOT NULL,
+    PRIMARY KEY (store, path, hash_kind)
+);
+CREATE INDEX IF NOT EXISTS files_by_path_hash ON files (hash_kind, path, hash);
+CREATE INDEX IF NOT EXISTS files_by_hash ON files (hash_kind, hash);
+CREATE TABLE IF NOT EXISTS file_references (
+    store TEXT NOT NULL,
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (store, source, kind, target)
+);
+CREATE INDEX IF NOT EXISTS references_by_target ON file_references (target, store);
+CREATE TABLE IF NOT EXISTS features (
+    store TEXT NOT NULL,
+    path TEXT NOT NULL,
+    family TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    PRIMARY KEY (store, path, family, pattern)
+);
+CREATE INDEX IF NOT EXISTS features_by_pattern ON features (family, pattern);
+"""
+
+
+class AnalysisDB:
+    """Indexed store of files, references and feature matches."""
+
+    def __init__(self, db_path=ANALYSIS_DB_PATH):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        """Drop a files table that doesn't key its rows by hash_kind.
+
+        Its hashes are of unknown or mixed kinds, so SCHEMA recreates the
+        table and the next sync_files() refills it.
+        """
+        key_columns = {row[1]: row[5] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if key_columns and not key_columns.get('hash_kind'):
+            with self.conn:
+                self.conn.execute("DROP TABLE files")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _sync_rows(self, table, key_columns, rows, stores, scope=None):
+        """Make table match rows ({key tuple: value tuple}) for the given stores.
+
+        scope ({column: value}) further limits the rows that are synced.
+        Only rows that are new, changed or gone are written. Returns
+        {'inserted', 'updated', 'deleted', 'unchanged'} counts.
+        """
+        columns = self._columns(table)
+        value_columns = [column for column in columns if column not in key_columns]
+        placeholders = ', '.join('?' for _ in stores)
+        scope = scope or {}
+        condition = ''.join(f" AND {column} = ?" for column in scope)
+        existing = {}
+        for row in self.conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE store IN ({placeholders}){condition}",
+                list(stores) + list(scope.values())):
+            existing[tuple(row[:len(key_columns)])] = tuple(row[len(key_columns):])
+
+        inserted = [key + value for key, value in rows.items() if key not in existing]
+        updated = [value + key for key, value in rows.items()
+                   if key in existing and existing[key] != value]
+        deleted = [key for key in existing if key not in rows]
+
+        key_match = ' AND '.join(f"{column} = ?" for column in key_columns)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                inserted)
+            if value_columns:
+                self.conn.executemany(
+                    f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in value_columns)} "
+                    f"WHERE {key_match}", updated)
+            self.conn.executemany(f"DELETE FROM {table} WHERE {key_match}", deleted)
+
+        return {'inserted': len(inserted), 'updated': len(updated), 'deleted': len(deleted),
+                'unchanged': len(rows) - len(inserted) - len(updated)}
+
+    def _columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def sync_files(self, index):
+        """Upsert every row of a FileIndex (stores and /shared/).
+
+        Every configured store is synced, so the rows of a store that is
+        gone from disk are deleted. Only the rows of the index's hash_kind
+        are touched; rows synced from indexes of other kinds are kept.
+        """
+        rows = {}
+        counts = {}
+        for row in range(len(index)):
+            store = index.store_col[row]
+            rows[(store, index.path_col[row], index.hash_kind)] = (
+                index.size_col[row], index.hash_col[row], int(bool(index.shared_col[row])))
+            counts[store] = counts.get(store, 0) + 1
+
+        stores = list(index.stores) + [SHARED]
+        result = self._sync_rows('files', ('store', 'path', 'hash_kind'), rows, stores,
+                                 scope={'hash_kind': index.hash_kind})
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO stores (name, is_shared, file_count) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET is_shared = excluded.is_shared, "
+                "file_count = excluded.file_count "
+                "WHERE is_shared != excluded.is_shared OR file_count != excluded.file_count",
+                [(store, int(store == SHARED), counts.get(store, 0)) for store in stores])
+        return result
+
+    def sync_references(self, graph):
+        """Upsert the render/include/section/asset edges of a LiquidGraph."""
+        rows = {}
+        for store in graph.stores:
+            for source, edges in graph.edges[store].items():
+                for kind, target in edges:
+                    rows[(store, source, kind, target)] = ()
+        return self._sync_rows('file_references', ('store', 'source', 'kind', 'target'),
+                               rows, graph.stores)
+
+    def sync_features(self, matrix):
+        """Upsert a {store: {path: {family: [pattern names]}}} reference matrix."""
+        rows = {}
+        for store, files in matrix.items():
+            for rel_path, families in files.items():
+                for family, patterns in families.items():
+                    for pattern in patterns:
+                        rows[(store, rel_path, family, pattern)] = ()
+        return self._sync_rows('features', ('store', 'path', 'family', 'pattern'), rows, list(matrix))
+
+    def hash_kinds(self):
+        """Hash kinds with synced files, most exact first."""
+        synced = {kind for kind, in self.conn.execute("SELECT DISTINCT hash_kind FROM files")}
+        return ([kind for kind in HASH_KIND_PREFERENCE if kind in synced] +
+                sorted(synced - set(HASH_KIND_PREFERENCE)))
+
+    def _hash_kind(self, hash_kind):
+        if hash_kind is not None:
+            return hash_kind
+        kinds = self.hash_kinds()
+        return kinds[0] if kinds else None
+
+    def identical_in(self, store_count, hash_kind=None):
+        """[(path, stores)] for copies identical in exactly store_count stores.
+
+        Hashes of one kind are compared: hash_kind, or by default the most
+        exact kind that has been synced.
+        """
+        query = """
+            SELECT path, GROUP_CONCAT(store, ',') FROM files
+            WHERE hash_kind = ? AND store != ? AND hash IS NOT NULL
+            GROUP BY path, hash HAVING COUNT(*) = ?
+            ORDER BY path
+        """
+        return [(path, stores.split(','))
+                for path, stores in self.conn.execute(
+                    query, (self._hash_kind(hash_kind), SHARED, store_count))]
+
+    def versions(self, rel_path, hash_kind=None):
+        """{hash: [stores]} for every copy of a path, /shared/ included (see identical_in)."""
+        result = {}
+        for store, file_hash in self.conn.execute(
+                "SELECT store, hash FROM files WHERE hash_kind = ? AND path = ? ORDER BY store",
+                (self._hash_kind(hash_kind), rel_path)):
+            result.setdefault(file_hash, []).append(store)
+        return result
+
+    def users_of(self, target, store=None):
+        """[(store, source, kind)] for files that reference target."""
+        query = "SELECT store, source, kind FROM file_references WHERE target = ?"
+        params = [target]
+        if store is not None:
+            query += " AND store = ?"
+            params.append(store)
+        return list(self.conn.execute(query + " ORDER BY store, source", params))
+
+    def feature_files(self, pattern):
+        """{store: [paths]} for files matching a feature pattern or pattern family."""
+        result = {}
+        for store, rel_path in self.conn.execute(
+                "SELECT DISTINCT store, path FROM features WHERE pattern = ? OR family = ? "
+                "ORDER BY store, path", (pattern, pattern)):
+            result.setdefault(store, []).append(rel_path)
+        return result
+
+
+def print_sync_result(name, result):
+    print(f"  {name}: {result['inserted']} added, {result['updated']} changed, "
+          f"{result['deleted']} removed, {result['unchanged']} unchanged")
+
+
+def arg_value(flag):
+    """Return the value following flag on the command line, or None."""
+    if flag in sys.argv:
+        position = sys.argv.index(flag) + 1
+        if position < len(sys.argv):
+            return sys.argv[position]
+    return None
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    use_git = '--git' in sys.argv
+    index = build_index(themes_dir, shared_dir, use_git=use_git)
+    graph = build_liquid_graph(themes_dir, shared_dir, index=index)
+
+    with AnalysisDB() as db:
+        print(f"Syncing {db.db_path}...")
+        print_sync_result('files', db.sync_files(index))
+        print_sync_result('references', db.sync_references(graph))
+
+        identical = arg_value('--identical')
+        users = arg_value('--users')
+        feature = arg_value('--feature')
+        # Compare the hashes just synced unless another kind is asked for
+        hash_kind = arg_value('--hash-kind') or index.hash_kind
+
+        if identical:
+            matches = db.identical_in(int(identical), hash_kind)
+            print(f"\nFiles identical in exactly {identical} stores: {len(matches)}")
+            for rel_path, stores in matches:
+                print(f"  {rel_path} ({', '.join(stores)})")
+        if users:
+            print(f"\n{users} is referenced by:")
+            for store, source, kind in db.users_of(users):
+                print(f"  {store}: {source} ({kind})")
+        if feature:
+            # Feature matches are recorded by analyze_enquiry_system.py
+            print(f"\nFiles matching {feature}:")
+            for store, paths in db.feature_files(feature).items():
+                print(f"  {store}: {len(paths)} files")
+                for rel_path in paths:
+                    print(f"    {rel_path}")
+        if not (identical or users or feature):
+            print(f"\nFiles by number of stores with an identical copy ({hash_kind} hashes):")
+            for store_count in range(len(STORES), 1, -1):
+                print(f"  {store_count} stores: {len(db.identical_in(store_count, hash_kind))}")
+
+
+if __name__ == "__main__":
+    main()
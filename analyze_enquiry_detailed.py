@@ -2,6 +2,91 @@
 import os
 import re
 from pathlib import Path
+from collections import deque
+
+from analyze_enquiry_system import FILE_EXTENSIONS, REFERENCE_PATTERNS, search_all_stores
+
+def iter_matches(file_path, pattern, max_matches=None, before=0, after=0, flags=re.IGNORECASE):
+    """Yield (line_number, text) for lines matching pattern, read line by line.
+    
+    text is the matching line plus up to `before`/`after` context lines; like
+    a regex over the whole file, a hit never starts inside the previous hit's
+    trailing context. Reading stops as soon as max_matches hits are complete,
+    so only the context window is ever held in memory.
+    """
+    regex = re.compile(pattern, flags)
+    history = deque(maxlen=before)
+    pending = None  # [line_number, lines] of a hit still collecting context
+    context_end = 0  # Last line belonging to the current hit
+    found = 0
+    
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if line_number <= context_end:
+                pending[1].append(line)
+                if line_number == context_end:
+                    yield pending[0], '\n'.join(pending[1])
+                    pending = None
+            elif max_matches is not None and found >= max_matches:
+                return
+            elif regex.search(line):
+                found += 1
+                if after:
+                    pending = [line_number, list(history) + [line]]
+                    context_end = line_number + after
+                else:
+                    yield line_number, '\n'.join(list(history) + [line])
+            history.append(line)
+    
+    # A hit near the end of the file gets whatever context there was
+    if pending is not None:
+        yield pending[0], '\n'.join(pending[1])
+
+def iter_blocks(file_path, start_pattern, end_pattern, contains_pattern, max_blocks=None,
+                flags=re.IGNORECASE):
+    """Yield (line_number, text) for start..end line blocks that mention contains_pattern.
+    
+    Used for multi-line constructs like <script> tags; only the current block
+    is held in memory and reading stops after max_blocks hits.
+    """
+    start_regex = re.compile(start_pattern, flags)
+    end_regex = re.compile(end_pattern, flags)
+    contains_regex = re.compile(contains_pattern, flags)
+    block = None
+    block_start = 0
+    found = 0
+    
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_number, line in enumerate(f, 1):
+            if block is None:
+                match = start_regex.search(line)
+                if not match:
+                    continue
+                block, block_start = [], line_number
+                line = line[match.start():]
+            block.append(line)
+            if end_regex.search(line):
+                text = ''.join(block)
+                block = None
+                if contains_regex.search(text):
+                    yield block_start, text
+                    found += 1
+                    if max_blocks is not None and found >= max_blocks:
+                        return
+
+def find_lines(file_path, needles):
+    """Return the needles that occur in file_path, stopping once all are found."""
+    remaining = set(needles)
+    found = set()
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            hits = {needle for needle in remaining if needle in line}
+            found |= hits
+            remaining -= hits
+            if not remaining:
+                break
+    return found
 
 def extract_enquiry_code_snippets():
     """Extract specific code snippets showing enquiry integration."""
@@ -21,23 +106,20 @@ def extract_enquiry_code_snippets():
     other_header = os.path.join(other_store_dir, 'sections', 'header.liquid')
     
     try:
-        with open(build4less_header, 'r', encoding='utf-8', errors='ignore') as f:
-            b4l_content = f.read()
-        with open(other_header, 'r', encoding='utf-8', errors='ignore') as f:
-            other_content = f.read()
-        
         # Find enquiry-specific code in build4less
-        enquiry_snippets = re.findall(r'.*enquiry.*\n', b4l_content, re.IGNORECASE)
+        enquiry_snippets = list(iter_matches(build4less_header, r'enquiry', max_matches=5))
         
         print("\nEnquiry-related code in build4less header.liquid:")
-        for i, snippet in enumerate(enquiry_snippets[:5], 1):
-            print(f"  Line {i}: {snippet.strip()}")
+        for line_number, snippet in enquiry_snippets:
+            print(f"  Line {line_number}: {snippet.strip()}")
         
         # Check if these exist in other store
         print("\nPresence in other stores: ")
-        for snippet in enquiry_snippets[:3]:
-            if snippet.strip() not in other_content:
-                print(f"  MISSING: {snippet.strip()[:80]}...")
+        checked = [snippet.strip() for _, snippet in enquiry_snippets[:3]]
+        present = find_lines(other_header, checked)
+        for snippet in checked:
+            if snippet not in present:
+                print(f"  MISSING: {snippet[:80]}...")
     except Exception as e:
         print(f"  Error: {e}")
     
@@ -49,23 +131,19 @@ def extract_enquiry_code_snippets():
     other_theme = os.path.join(other_store_dir, 'layout', 'theme.liquid')
     
     try:
-        with open(build4less_theme, 'r', encoding='utf-8', errors='ignore') as f:
-            b4l_theme = f.read()
-        with open(other_theme, 'r', encoding='utf-8', errors='ignore') as f:
-            other_theme_content = f.read()
-        
         # Find script includes
-        scripts = re.findall(r'<script.*?enquiry.*?</script>', b4l_theme, re.IGNORECASE | re.DOTALL)
-        sections = re.findall(r'{%.*?enquiry.*?%}', b4l_theme, re.IGNORECASE)
+        scripts = iter_blocks(build4less_theme, r'<script', r'</script>', r'enquiry', max_blocks=5)
+        sections = iter_matches(build4less_theme, r'{%.*?enquiry.*?%}', max_matches=5)
         
         print("\nEnquiry scripts in build4less theme.liquid:")
-        for script in scripts[:5]:
+        for _, script in scripts:
             cleaned = script.replace('\n', ' ').strip()[:100]
             print(f"  {cleaned}...")
         
         print("\nEnquiry sections/renders in build4less theme.liquid:")
-        for section in sections[:5]:
-            print(f"  {section.strip()}")
+        for _, line in sections:
+            for section in re.findall(r'{%.*?enquiry.*?%}', line, re.IGNORECASE):
+                print(f"  {section.strip()}")
             
     except Exception as e:
         print(f"  Error: {e}")
@@ -77,19 +155,16 @@ def extract_enquiry_code_snippets():
     build4less_product = os.path.join(build4less_dir, 'sections', 'main-product.liquid')
     
     try:
-        with open(build4less_product, 'r', encoding='utf-8', errors='ignore') as f:
-            product_content = f.read()
-        
         # Find grouped product code
-        grouped_snippets = re.findall(r'.*grouped.*\n', product_content, re.IGNORECASE)
-        availability_snippets = re.findall(r'.*availability.*\n', product_content, re.IGNORECASE)
+        grouped_snippets = iter_matches(build4less_product, r'grouped', max_matches=3)
+        availability_snippets = iter_matches(build4less_product, r'availability', max_matches=3)
         
         print("\nGrouped product code in main-product.liquid:")
-        for snippet in grouped_snippets[:3]:
+        for _, snippet in grouped_snippets:
             print(f"  {snippet.strip()[:100]}...")
         
         print("\nAvailability code in main-product.liquid:")
-        for snippet in availability_snippets[:3]:
+        for _, snippet in availability_snippets:
             print(f"  {snippet.strip()[:100]}...")
             
     except Exception as e:
@@ -103,23 +178,20 @@ def extract_enquiry_code_snippets():
     other_buttons = os.path.join(other_store_dir, 'snippets', 'buy-buttons.liquid')
     
     try:
-        with open(build4less_buttons, 'r', encoding='utf-8', errors='ignore') as f:
-            b4l_buttons = f.read()
-        with open(other_buttons, 'r', encoding='utf-8', errors='ignore') as f:
-            other_buttons_content = f.read()
-        
-        # Find enquiry button code
-        enquiry_button = re.findall(r'.*enquiry.*\n.*\n.*\n', b4l_buttons, re.IGNORECASE)
+        # Find enquiry button code (matching line plus the two after it)
+        enquiry_button = iter_matches(build4less_buttons, r'enquiry', max_matches=2, after=2)
         
         print("\nEnquiry button code in build4less buy-buttons.liquid:")
-        for code in enquiry_button[:2]:
+        for _, code in enquiry_button:
             print(f"  {code.strip()[:200]}...")
         
         # Calculate size difference
+        b4l_size = os.path.getsize(build4less_buttons)
+        other_size = os.path.getsize(other_buttons)
         print(f"\nFile size comparison:")
-        print(f"  build4less: {len(b4l_buttons)} bytes")
-        print(f"  other stores: {len(other_buttons_content)} bytes")
-        print(f"  Difference: {len(b4l_buttons) - len(other_buttons_content)} bytes")
+        print(f"  build4less: {b4l_size} bytes")
+        print(f"  other stores: {other_size} bytes")
+        print(f"  Difference: {b4l_size - other_size} bytes")
         
     except Exception as e:
         print(f"  Error: {e}")
@@ -219,6 +291,29 @@ def analyze_javascript_integration():
     except Exception as e:
         print(f"  Error analyzing product-form.js: {e}")
 
+def analyze_cross_store_spread():
+    """Show which files in every store and /shared/ reference each feature."""
+    
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+    
+    print("\n7. CROSS-STORE SPREAD (all stores + /shared/)")
+    print("-" * 80)
+    
+    matrix = search_all_stores(themes_dir, shared_dir, REFERENCE_PATTERNS, FILE_EXTENSIONS)
+    
+    for store, files in matrix.items():
+        print(f"\n{store}:")
+        for family in REFERENCE_PATTERNS:
+            family_files = sorted(path for path, refs in files.items() if family in refs)
+            print(f"  {family}: {len(family_files)} files")
+            for path in family_files[:5]:
+                print(f"    - {path} ({', '.join(files[path][family])})")
+            if len(family_files) > 5:
+                print(f"    ... and {len(family_files) - 5} more")
+    
+    return matrix
+
 def generate_final_report(unique_files):
     """Generate final implementation report."""
     
@@ -273,6 +368,7 @@ This will enable all stores to have:
 def main():
     unique_files = extract_enquiry_code_snippets()
     analyze_javascript_integration()
+    analyze_cross_store_spread()
     generate_final_report(unique_files)
 
 if __name__ == "__main__":
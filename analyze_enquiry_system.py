@@ -3,90 +3,234 @@ import os
 import re
 import json
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-def search_for_references(directory, patterns, file_extensions):
-    """Search for pattern references in files."""
-    references = {}
-    
-    for root, dirs, files in os.walk(directory):
-        dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules']]
-        
-        for file in files:
-            # Check if file has relevant extension
-            if not any(file.endswith(ext) for ext in file_extensions):
-                continue
-                
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, directory).replace('\\', '/')
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-                    for pattern_name, pattern in patterns.items():
-                        if re.search(pattern, content, re.IGNORECASE):
-                            if rel_path not in references:
-                                references[rel_path] = []
-                            references[rel_path].append(pattern_name)
-            except:
-                pass
+from file_index import SHARED, STORES, scan_tree
+from analysis_db import AnalysisDB, print_sync_result
+
+# Patterns to search for enquiry system references
+ENQUIRY_PATTERNS = {
+    'enquiry-cart': r'enquiry[_-]?cart',
+    'enquiry-form': r'enquiry[_-]?form',
+    'enquiry-drawer': r'enquiry[_-]?drawer',
+    'enquiry-icon': r'enquiry[_-]?icon',
+    'enquiry-notification': r'enquiry[_-]?notification',
+    'enquiry-config': r'enquiry[_-]?config',
+    'enquiry-badge': r'enquiry[_-]?badge',
+    'enquiry-checkout': r'enquiry[_-]?checkout',
+    'addToEnquiry': r'addToEnquiry',
+    'EnquiryCart': r'EnquiryCart',
+    'enquirySubmit': r'enquirySubmit'
+}
+
+# Patterns for custom grouped products
+GROUPED_PATTERNS = {
+    'grouped-product': r'grouped[_-]?product',
+    'custom-grouped': r'custom[_-]?grouped',
+    'product-grouping': r'product[_-]?grouping',
+    'group-options': r'group[_-]?options',
+    'option-picker': r'option[_-]?picker'
+}
+
+# Patterns for custom product availability
+AVAILABILITY_PATTERNS = {
+    'custom-availability': r'custom[_-]?availability',
+    'product-availability': r'product[_-]?availability',
+    'availability-notice': r'availability[_-]?notice',
+    'stock-status': r'stock[_-]?status',
+    'unavailable-product': r'unavailable[_-]?product',
+    'unavailable-variant': r'unavailable[_-]?variant'
+}
+
+REFERENCE_PATTERNS = {
+    'enquiry': ENQUIRY_PATTERNS,
+    'grouped': GROUPED_PATTERNS,
+    'availability': AVAILABILITY_PATTERNS
+}
+
+FILE_EXTENSIONS = ['.liquid', '.js', '.css', '.json']
+
+def literal_prefix(pattern):
+    """Split a regex into its leading plain-text prefix and the remainder.
+
+    The prefix is empty when nothing can safely be split off; the
+    remainder is never empty, so each pattern keeps a non-empty group.
+    """
+    if '|' in pattern:
+        # A prefix would only bind to the first alternative
+        return '', pattern
+    end = 0
+    while end < len(pattern) and (pattern[end].isalnum() or pattern[end] in '_-'):
+        end += 1
+    if end < len(pattern) and pattern[end] in '?*+{':
+        # The last literal belongs to the quantifier that follows it
+        end -= 1
+    elif end == len(pattern):
+        # An all-literal pattern keeps its last character in the group
+        end -= 1
+    if end <= 0:
+        return '', pattern
+    return pattern[:end], pattern[end:]
+
+class MultiPatternMatcher:
+    """Match many named regexes against a text with one compiled alternation.
+    
+    The patterns' literal prefixes are merged into a trie, so the alternation
+    branches on one character at a time instead of trying every pattern at
+    every position. An alternation only reports the first pattern matching
+    at a position, so while new patterns keep turning up, the text is scanned
+    again for just the patterns not found yet; a scan that finds nothing new
+    proves the rest are absent.
+    """
     
+    def __init__(self, pattern_families, flags=re.IGNORECASE):
+        self.keys = []  # group number -> (family, pattern_name)
+        self.patterns = []
+        for family, patterns in pattern_families.items():
+            for pattern_name, pattern in patterns.items():
+                self.keys.append((family, pattern_name))
+                self.patterns.append(pattern)
+        self.flags = flags
+        self._compiled = {}
+    
+    def _regex(self, indices):
+        if indices not in self._compiled:
+            trie = {}
+            for i in sorted(indices):
+                prefix, remainder = literal_prefix(self.patterns[i])
+                if self.flags & re.IGNORECASE:
+                    prefix = prefix.lower()
+                node = trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(f'(?P<p{i}>{remainder})')
+            self._compiled[indices] = re.compile(self._trie_regex(trie), self.flags)
+        return self._compiled[indices]
+    
+    def _trie_regex(self, node):
+        branches = list(node.get(None, []))
+        for char, child in sorted((k, v) for k, v in node.items() if k is not None):
+            branches.append(re.escape(char) + self._trie_regex(child))
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+    
+    def find(self, content):
+        """Return the (family, pattern_name) keys of every pattern found in content."""
+        remaining = frozenset(range(len(self.patterns)))
+        found = set()
+        while remaining:
+            new = set()
+            for match in self._regex(remaining).finditer(content):
+                new.add(int(match.lastgroup[1:]))
+                if len(new) == len(remaining):
+                    break
+            if not new:
+                break
+            found |= new
+            remaining = remaining - new
+        return [self.keys[i] for i in sorted(found)]
+
+def references_by_family(store_refs, pattern_families):
+    """Regroup one store's {rel_path: {family: [pattern names]}} matrix entries
+    as {family: {rel_path: [pattern names]}}.
+    """
+    references = {family: {} for family in pattern_families}
+    for rel_path, families in store_refs.items():
+        for family, pattern_names in families.items():
+            references[family][rel_path] = pattern_names
     return references
 
-def analyze_enquiry_system():
-    """Analyze all components of the enquiry system."""
+FILES_PER_TASK = 64  # Files handed to a worker process at a time
+
+_worker_matcher = None
+
+def _init_search_worker(pattern_families):
+    """Compile the matcher once per worker process."""
+    global _worker_matcher
+    _worker_matcher = MultiPatternMatcher(pattern_families)
+
+def _search_files(batch):
+    """Search a batch of (store, rel_path, file_path) in a worker process."""
+    results = []
+    for store, rel_path, file_path in batch:
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        except OSError:
+            continue
+        found = _worker_matcher.find(content)
+        if found:
+            results.append((store, rel_path, found))
+    return results
+
+def search_all_stores(themes_dir, shared_dir, pattern_families, file_extensions, workers=None):
+    """Search every store and /shared/ at once on a process pool.
     
-    build4less_dir = r"C:\Users\User\projects\shopify\multisite\themes\build4less"
+    Returns a store x file x pattern matrix:
+    {store: {rel_path: {family: [pattern names]}}}, with /shared/ under 'shared'.
+    """
+    trees = [(store, os.path.join(themes_dir, store)) for store in STORES]
+    if shared_dir:
+        trees.append((SHARED, shared_dir))
+    
+    files = []
+    for store, tree_dir in trees:
+        if not os.path.isdir(tree_dir):
+            print(f"Warning: Store path not found: {tree_dir}")
+            continue
+        for rel_path, file_path, _ in scan_tree(tree_dir):
+            if any(rel_path.endswith(ext) for ext in file_extensions):
+                files.append((store, rel_path, file_path))
+    
+    batches = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+    matrix = {store: {} for store, _ in trees}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=(pattern_families,)) as executor:
+        for results in executor.map(_search_files, batches):
+            for store, rel_path, found in results:
+                file_refs = matrix[store].setdefault(rel_path, {})
+                for family, pattern_name in found:
+                    file_refs.setdefault(family, []).append(pattern_name)
+    
+    return matrix
+
+def print_reference_matrix(matrix, pattern_families):
+    """Print which stores reference each pattern, and in how many files."""
+    stores = list(matrix)
     
-    # Patterns to search for enquiry system references
-    enquiry_patterns = {
-        'enquiry-cart': r'enquiry[_-]?cart',
-        'enquiry-form': r'enquiry[_-]?form',
-        'enquiry-drawer': r'enquiry[_-]?drawer',
-        'enquiry-icon': r'enquiry[_-]?icon',
-        'enquiry-notification': r'enquiry[_-]?notification',
-        'enquiry-config': r'enquiry[_-]?config',
-        'enquiry-badge': r'enquiry[_-]?badge',
-        'enquiry-checkout': r'enquiry[_-]?checkout',
-        'addToEnquiry': r'addToEnquiry',
-        'EnquiryCart': r'EnquiryCart',
-        'enquirySubmit': r'enquirySubmit'
-    }
+    print("\n" + "=" * 80)
+    print("CROSS-STORE REFERENCE MATRIX (files referencing each pattern)")
+    print("-" * 80)
+    print(f"{'pattern':<24}" + ''.join(f"{store[:12]:>13}" for store in stores))
+    
+    for family, patterns in pattern_families.items():
+        print(f"\n{family.upper()}")
+        for pattern_name in patterns:
+            counts = [
+                sum(1 for refs in matrix[store].values() if pattern_name in refs.get(family, []))
+                for store in stores
+            ]
+            print(f"  {pattern_name:<22}" + ''.join(f"{count:>13}" for count in counts))
+
+def analyze_enquiry_system(matrix):
+    """Analyze all components of the enquiry system.
     
-    # Patterns for custom grouped products
-    grouped_patterns = {
-        'grouped-product': r'grouped[_-]?product',
-        'custom-grouped': r'custom[_-]?grouped',
-        'product-grouping': r'product[_-]?grouping',
-        'group-options': r'group[_-]?options',
-        'option-picker': r'option[_-]?picker'
-    }
+    References come from the all-store matrix (see search_all_stores), so
+    build4less isn't searched a second time.
+    """
     
-    # Patterns for custom product availability
-    availability_patterns = {
-        'custom-availability': r'custom[_-]?availability',
-        'product-availability': r'product[_-]?availability',
-        'availability-notice': r'availability[_-]?notice',
-        'stock-status': r'stock[_-]?status',
-        'unavailable-product': r'unavailable[_-]?product',
-        'unavailable-variant': r'unavailable[_-]?variant'
-    }
+    build4less_dir = r"C:\Users\User\projects\shopify\multisite\themes\build4less"
     
-    file_extensions = ['.liquid', '.js', '.css', '.json']
     
     print("=" * 80)
     print("ENQUIRY SYSTEM, GROUPED PRODUCTS & AVAILABILITY ANALYSIS")
     print("=" * 80)
     
-    # Find all references
-    print("\nSearching for enquiry system references...")
-    enquiry_refs = search_for_references(build4less_dir, enquiry_patterns, file_extensions)
-    
-    print("Searching for grouped product references...")
-    grouped_refs = search_for_references(build4less_dir, grouped_patterns, file_extensions)
-    
-    print("Searching for availability references...")
-    availability_refs = search_for_references(build4less_dir, availability_patterns, file_extensions)
+    references = references_by_family(matrix.get('build4less', {}), REFERENCE_PATTERNS)
+    enquiry_refs = references['enquiry']
+    grouped_refs = references['grouped']
+    availability_refs = references['availability']
     
     # Categorize files
     unique_enquiry_files = []
@@ -316,19 +460,34 @@ def generate_implementation_checklist():
     print(checklist)
 
 def main():
+    # Find all references in every store and /shared/ in one pass
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+    print("Searching for enquiry, grouped product and availability references...")
+    matrix = search_all_stores(themes_dir, shared_dir, REFERENCE_PATTERNS, FILE_EXTENSIONS)
+    
     # Run analysis
-    unique_files, enquiry_refs, grouped_refs, availability_refs = analyze_enquiry_system()
+    unique_files, enquiry_refs, grouped_refs, availability_refs = analyze_enquiry_system(matrix)
     
     # Generate implementation checklist
     generate_implementation_checklist()
     
+    # Audit how far the features have spread across every store
+    print_reference_matrix(matrix, REFERENCE_PATTERNS)
+    
+    # Record the matches so they can be queried with analysis_db.py --feature
+    with AnalysisDB() as db:
+        print(f"\nSyncing {db.db_path}...")
+        print_sync_result('features', db.sync_features(matrix))
+    
     # Save results
     results = {
         'unique_files_to_move': unique_files,
         'files_with_enquiry_refs': list(enquiry_refs.keys()),
         'files_with_grouped_refs': list(grouped_refs.keys()),
         'files_with_availability_refs': list(availability_refs.keys()),
-        'total_files_affected': len(set(list(enquiry_refs.keys()) + list(grouped_refs.keys()) + list(availability_refs.keys())))
+        'total_files_affected': len(set(list(enquiry_refs.keys()) + list(grouped_refs.keys()) + list(availability_refs.keys()))),
+        'cross_store_references': matrix
     }
     
     with open('enquiry_system_analysis.json', 'w') as f:
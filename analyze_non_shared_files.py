@@ -4,116 +4,122 @@ Analyze non-shared files across all 6 Shopify stores to understand store uniquen
 This script categorizes files that are NOT in the shared folder.
 """
 
-import os
-import json
-import hashlib
+import sys
 from pathlib import Path
-from collections import defaultdict
 
-def get_file_hash(filepath):
-    """Get MD5 hash of a file"""
-    try:
-        with open(filepath, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
-    except:
-        return None
+from analysis_db import AnalysisDB, print_sync_result
+from file_index import build_index
+from override_index import OverrideIndex
+from report_writer import open_report, report_path
 
-def get_file_size(filepath):
-    """Get file size"""
-    try:
-        return os.path.getsize(filepath)
-    except:
-        return 0
+def analyze_non_shared_files(report, use_git=False):
+    """Analyze files that exist in stores but are NOT in the shared folder.
 
-def analyze_non_shared_files():
-    """Analyze files that exist in stores but are NOT in the shared folder"""
+    Detailed results are streamed to report (see report_writer); the
+    summary, critical identity files and a few examples are returned.
+    """
     
     themes_dir = Path("C:/Users/User/projects/shopify/multisite/themes")
     shared_dir = Path("C:/Users/User/projects/shopify/multisite/shared")
     stores = ["build4less", "tiles4less", "building-supplies-online", "insulation4less", "insulation4us", "roofing4us"]
     
-    # Get list of shared files
-    shared_files = set()
-    if shared_dir.exists():
-        for root, dirs, files in os.walk(shared_dir):
-            for file in files:
-                rel_path = os.path.relpath(os.path.join(root, file), shared_dir)
-                shared_files.add(rel_path.replace("\\", "/"))
-    
-    print(f"Found {len(shared_files)} shared files")
-    
-    # Analyze non-shared files
-    non_shared_analysis = {
-        "summary": {},
-        "files_in_all_stores_different_content": [],  # Files in all 6 stores but with different content
-        "files_in_some_stores_only": [],              # Files in some stores but not others
-        "store_unique_files": {store: [] for store in stores},  # Files unique to each store
-        "file_size_analysis": {},
-        "critical_identity_files": {}
-    }
+    # One scan of /shared/ and every store
+    index = build_index(str(themes_dir), str(shared_dir), stores=stores, verbose=False,
+                        use_git=use_git)
+    for store in index.missing_stores:
+        print(f"Warning: Store {store} not found")
     
-    # Collect all files from all stores
-    all_files_by_store = {}
-    file_presence = defaultdict(list)  # file_path -> [stores where it exists]
-    file_hashes = {}  # (store, file_path) -> hash
+    print(f"Found {len(index.shared_files())} shared files")
     
-    for store in stores:
-        store_path = themes_dir / store
-        all_files_by_store[store] = []
-        
-        if not store_path.exists():
-            print(f"Warning: Store {store} not found")
-            continue
-            
-        for root, dirs, files in os.walk(store_path):
-            for file in files:
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, store_path)
-                rel_path = rel_path.replace("\\", "/")
-                
-                # Skip if file is in shared folder
-                if rel_path in shared_files:
-                    continue
-                
-                all_files_by_store[store].append(rel_path)
-                file_presence[rel_path].append(store)
-                file_hashes[(store, rel_path)] = get_file_hash(full_path)
+    # Record this scan in the queryable database (see analysis_db.py)
+    with AnalysisDB() as db:
+        print_sync_result(f"files in {db.db_path}", db.sync_files(index))
+    
+    overrides = OverrideIndex(index)
+    
+    # Non-shared files are read straight from the index: a path's copies
+    # are looked up per store instead of being copied into separate maps
+    non_shared_paths = list(dict.fromkeys(index.path_col[row] for row in index.rows(include_shared=False)))
+    
+    def copies(file_path):
+        """{store: row} for the non-shared copies of a path, in store order."""
+        result = {}
+        for store in stores:
+            row = index.get(store, file_path)
+            if row is not None and not index.shared_col[row]:
+                result[store] = row
+        return result
     
     print(f"Analyzing non-shared files...")
     
-    # Categorize files
-    for file_path, stores_with_file in file_presence.items():
-        if len(stores_with_file) == 6:
+    # Each category is streamed to the report as it is found; only counts
+    # and the first few examples are kept for the printed summary
+    counts = {}
+    examples = []
+    
+    # Store files that /shared/ replaces on deploy
+    report.begin_list("masked_by_shared_with_different_content")
+    counts["masked_by_shared_with_different_content"] = 0
+    for item in overrides.conflicts():
+        report.add(item)
+        counts["masked_by_shared_with_different_content"] += 1
+    report.end()
+    
+    # Files in all 6 stores but with different content
+    report.begin_list("files_in_all_stores_different_content")
+    counts["files_in_all_stores_different_content"] = 0
+    for file_path in non_shared_paths:
+        store_rows = copies(file_path)
+        if len(store_rows) == 6:
             # File exists in all stores - check if content is different
-            hashes = [file_hashes.get((store, file_path)) for store in stores_with_file]
-            unique_hashes = set(h for h in hashes if h is not None)
+            unique_hashes = set(index.hash_col[row] for row in store_rows.values())
             
             if len(unique_hashes) > 1:
                 # Different content across stores
-                store_hash_map = {store: file_hashes.get((store, file_path)) for store in stores_with_file}
-                non_shared_analysis["files_in_all_stores_different_content"].append({
+                store_hash_map = {store: index.hash_col[row] for store, row in store_rows.items()}
+                item = {
                     "file": file_path,
                     "store_hashes": store_hash_map,
                     "unique_versions": len(unique_hashes)
-                })
-        elif len(stores_with_file) < 6:
-            # File exists in some stores but not others
+                }
+                report.add(item)
+                counts["files_in_all_stores_different_content"] += 1
+                if len(examples) < 10:
+                    examples.append(item)
+    report.end()
+    
+    # Files in some stores but not others
+    report.begin_list("files_in_some_stores_only")
+    counts["files_in_some_stores_only"] = 0
+    for file_path in non_shared_paths:
+        stores_with_file = list(copies(file_path))
+        if len(stores_with_file) < 6:
             missing_stores = [store for store in stores if store not in stores_with_file]
-            non_shared_analysis["files_in_some_stores_only"].append({
+            report.add({
                 "file": file_path,
                 "exists_in": stores_with_file,
                 "missing_from": missing_stores,
                 "store_count": len(stores_with_file)
             })
-        
-        # Check for store-unique files (files that exist only in one store)
-        if len(stores_with_file) == 1:
-            store = stores_with_file[0]
-            file_size = get_file_size(themes_dir / store / file_path)
-            non_shared_analysis["store_unique_files"][store].append({
-                "file": file_path,
-                "size": file_size
-            })
+            counts["files_in_some_stores_only"] += 1
+    report.end()
+    
+    # Store-unique files (files that exist only in one store)
+    report.begin_object("store_unique_files")
+    store_unique_counts = {}
+    for store in stores:
+        report.begin_list(store)
+        store_unique_counts[store] = 0
+        for row in index.rows(store, include_shared=False):
+            file_path = index.path_col[row]
+            if list(copies(file_path)) == [store]:
+                report.add({
+                    "file": file_path,
+                    "size": index.size_col[row]
+                })
+                store_unique_counts[store] += 1
+        report.end()
+    report.end()
     
     # Identify critical identity files (files that likely define store uniqueness)
     critical_patterns = [
@@ -124,46 +130,57 @@ def analyze_non_shared_files():
         "templates/index.json"
     ]
     
+    critical_identity_files = {}
     for pattern in critical_patterns:
         stores_with_pattern = []
         pattern_analysis = {}
         
         for store in stores:
-            matching_files = [f for f in all_files_by_store.get(store, []) if pattern in f]
-            if matching_files:
+            matching_rows = [row for row in index.rows(store, include_shared=False)
+                             if pattern in index.path_col[row]]
+            if matching_rows:
                 stores_with_pattern.append(store)
-                file_path = themes_dir / store / matching_files[0]
                 pattern_analysis[store] = {
-                    "file": matching_files[0],
-                    "size": get_file_size(file_path),
-                    "hash": get_file_hash(file_path)
+                    "file": index.path_col[matching_rows[0]],
+                    "size": index.size_col[matching_rows[0]],
+                    "hash": index.hash_col[matching_rows[0]]
                 }
         
         if pattern_analysis:
-            non_shared_analysis["critical_identity_files"][pattern] = {
+            critical_identity_files[pattern] = {
                 "stores_with_file": stores_with_pattern,
                 "analysis": pattern_analysis,
                 "all_identical": len(set(info["hash"] for info in pattern_analysis.values() if info["hash"])) <= 1
             }
     
+    report.write("file_size_analysis", {})
+    report.write("critical_identity_files", critical_identity_files)
+    
     # Generate summary statistics
-    non_shared_analysis["summary"] = {
-        "total_non_shared_files": sum(len(files) for files in all_files_by_store.values()),
-        "files_in_all_stores_different_content": len(non_shared_analysis["files_in_all_stores_different_content"]),
-        "files_in_some_stores_only": len(non_shared_analysis["files_in_some_stores_only"]),
-        "store_unique_counts": {store: len(files) for store, files in non_shared_analysis["store_unique_files"].items()},
+    summary = {
+        "total_non_shared_files": sum(1 for _ in index.rows(include_shared=False)),
+        "files_in_all_stores_different_content": counts["files_in_all_stores_different_content"],
+        "files_in_some_stores_only": counts["files_in_some_stores_only"],
+        "store_unique_counts": store_unique_counts,
+        "masked_by_shared_with_different_content": counts["masked_by_shared_with_different_content"],
         "stores_analyzed": stores
     }
+    report.write("summary", summary)
     
-    return non_shared_analysis
+    return {
+        "summary": summary,
+        "critical_identity_files": critical_identity_files,
+        "files_in_all_stores_different_content": examples
+    }
 
 if __name__ == "__main__":
-    analysis = analyze_non_shared_files()
+    # --ndjson writes one record per line instead of a single JSON document
+    output_file = report_path("C:/Users/User/projects/shopify/multisite/non_shared_files_analysis.json",
+                              ndjson='--ndjson' in sys.argv)
     
-    # Save analysis
-    output_file = "C:/Users/User/projects/shopify/multisite/non_shared_files_analysis.json"
-    with open(output_file, 'w') as f:
-        json.dump(analysis, f, indent=2)
+    # Results are written as they are found (--git reads blob SHAs from git instead of hashing)
+    with open_report(output_file) as report:
+        analysis = analyze_non_shared_files(report, use_git='--git' in sys.argv)
     
     print(f"\nAnalysis saved to {output_file}")
     
@@ -172,13 +189,14 @@ if __name__ == "__main__":
     print(f"Total non-shared files analyzed: {analysis['summary']['total_non_shared_files']}")
     print(f"Files in ALL stores but with DIFFERENT content: {analysis['summary']['files_in_all_stores_different_content']}")
     print(f"Files in SOME stores only: {analysis['summary']['files_in_some_stores_only']}")
+    print(f"Store files masked by /shared/ with DIFFERENT content: {analysis['summary']['masked_by_shared_with_different_content']}")
     
     print("\n=== STORE-UNIQUE FILE COUNTS ===")
     for store, count in analysis['summary']['store_unique_counts'].items():
         print(f"{store}: {count} unique files")
     
     print("\n=== TOP FILES IN ALL STORES WITH DIFFERENT CONTENT ===")
-    for item in analysis["files_in_all_stores_different_content"][:10]:
+    for item in analysis["files_in_all_stores_different_content"]:
         print(f"- {item['file']} ({item['unique_versions']} versions)")
     
     print("\n=== CRITICAL IDENTITY FILES ===")
@@ -1,141 +1,137 @@
 #!/usr/bin/env python3
-import os
-import json
-import hashlib
+import sys
 from pathlib import Path
 from collections import defaultdict
 
-def get_file_hash(filepath):
-    """Calculate SHA256 hash of a file."""
-    sha256_hash = hashlib.sha256()
-    try:
-        with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-    except Exception as e:
-        return None
+from analysis_db import AnalysisDB, print_sync_result
+from file_index import STORES, build_index
+from override_index import OverrideIndex
+from report_writer import open_report, report_path
 
-def get_file_size(filepath):
-    """Get file size in bytes."""
-    try:
-        return os.path.getsize(filepath)
-    except:
-        return 0
+def stream_list(report, key, items, keep=10):
+    """Write items to report as the list key; return (count, first keep items).
 
-def load_shared_files():
-    """Load list of files already in shared folder."""
-    shared_files = set()
-    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
-    
-    for root, dirs, files in os.walk(shared_dir):
-        dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules']]
-        for file in files:
-            if file != 'SHARED_FILES_INFO.json':
-                rel_path = os.path.relpath(os.path.join(root, file), shared_dir).replace('\\', '/')
-                shared_files.add(rel_path)
-    
-    return shared_files
+    keep=None keeps every item.
+    """
+    count = 0
+    examples = []
+    report.begin_list(key)
+    for item in items:
+        report.add(item)
+        count += 1
+        if keep is None or len(examples) < keep:
+            examples.append(item)
+    report.end()
+    return count, examples
 
-def analyze_nonshared_files():
-    """Analyze files that are not in the shared folder."""
+def analyze_nonshared_files(report, use_git=False):
+    """Analyze files that are not in the shared folder.
+
+    Each category is streamed to report as it is found; the counts, the
+    files in all stores with different content, a few examples of the
+    other categories and the store-specific files are returned.
+    """
     base_dir = r"C:\Users\User\projects\shopify\multisite\themes"
-    stores = ['build4less', 'tiles4less', 'building-supplies-online', 
-              'insulation4less', 'insulation4us', 'roofing4us']
-    
-    # Load shared files list
-    shared_files = load_shared_files()
-    print(f"Found {len(shared_files)} files in /shared/ folder\n")
-    
-    # Collect all files from all stores
-    store_files = defaultdict(dict)  # {store: {file_path: hash}}
-    file_presence = defaultdict(list)  # {file_path: [stores that have it]}
-    file_sizes = defaultdict(dict)  # {file_path: {store: size}}
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+    stores = list(STORES)
     
     print("Analyzing stores...")
     print("-" * 60)
     
-    for store in stores:
-        store_path = os.path.join(base_dir, store)
-        if not os.path.exists(store_path):
-            continue
-            
-        print(f"Processing {store}...")
-        
-        for root, dirs, files in os.walk(store_path):
-            dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules']]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, store_path).replace('\\', '/')
-                
-                # Skip if file is in shared folder
-                if rel_path in shared_files:
-                    continue
-                
-                file_hash = get_file_hash(file_path)
-                file_size = get_file_size(file_path)
-                
-                if file_hash:
-                    store_files[store][rel_path] = file_hash
-                    file_presence[rel_path].append(store)
-                    file_sizes[rel_path][store] = file_size
+    # One scan of /shared/ and every store
+    index = build_index(base_dir, shared_dir, stores=stores, full_hashes=False, use_git=use_git)
+    print(f"Found {len(index.shared_files())} files in /shared/ folder")
     
-    # Categorize non-shared files
-    categories = {
-        'different_content_all_stores': [],  # Files in all stores but different
-        'different_content_most_stores': [], # Files in 4-5 stores with different content
-        'store_specific': defaultdict(list), # Files unique to specific stores
-        'partially_shared': [],              # Files identical in some stores
-    }
+    # Record this scan in the queryable database (see analysis_db.py)
+    with AnalysisDB() as db:
+        print_sync_result(f"files in {db.db_path}", db.sync_files(index))
+    
+    # Store files that /shared/ replaces on deploy, with edits that would be lost
+    overrides = OverrideIndex(index)
+    masked_count = sum(len(overrides.masked_files(store)) for store in stores)
     
-    # Analyze each file
-    for file_path, stores_with_file in file_presence.items():
-        if len(stores_with_file) == len(stores):
-            # File exists in all stores
-            hashes = {store_files[store][file_path] for store in stores_with_file}
-            if len(hashes) > 1:
-                # Different content across stores
-                categories['different_content_all_stores'].append({
+    # Files that are in the shared folder are left out; a path's copies are
+    # looked up in the index per store instead of being copied into maps
+    non_shared_paths = list(dict.fromkeys(index.path_col[row] for row in index.rows(include_shared=False)))
+    
+    def copies(file_path):
+        """{store: row} for the non-shared copies of a path, in store order."""
+        result = {}
+        for store in stores:
+            row = index.get(store, file_path)
+            if row is not None and not index.shared_col[row]:
+                result[store] = row
+        return result
+    
+    def different_content_all_stores():
+        # Files in all stores but different
+        for file_path in non_shared_paths:
+            store_rows = copies(file_path)
+            if len(store_rows) == len(stores) and len({index.hash_col[row] for row in store_rows.values()}) > 1:
+                yield {
                     'file': file_path,
-                    'sizes': {store: file_sizes[file_path][store] for store in stores_with_file}
-                })
-        elif len(stores_with_file) >= 4:
-            # File exists in most stores
-            hashes = {store_files[store][file_path] for store in stores_with_file}
-            categories['different_content_most_stores'].append({
-                'file': file_path,
-                'stores': stores_with_file,
-                'unique_versions': len(hashes)
-            })
-        elif len(stores_with_file) == 1:
-            # File unique to one store
-            store = stores_with_file[0]
-            categories['store_specific'][store].append(file_path)
-        else:
-            # File in some stores
-            hashes = {store_files[store][file_path] for store in stores_with_file}
-            if len(hashes) == 1:
-                # Same content in all stores that have it
-                categories['partially_shared'].append({
+                    'sizes': {store: index.size_col[row] for store, row in store_rows.items()}
+                }
+    
+    def partially_shared():
+        # Files identical in some stores
+        for file_path in non_shared_paths:
+            store_rows = copies(file_path)
+            if 1 < len(store_rows) < 4 and len({index.hash_col[row] for row in store_rows.values()}) == 1:
+                yield {
                     'file': file_path,
-                    'stores': stores_with_file,
+                    'stores': list(store_rows),
                     'could_be_shared': True
-                })
+                }
+    
+    # Every file in all stores with different content is printed
+    results = {'counts': {}, 'examples': {}}
+    for key, items, keep in (('different_content_all_stores', different_content_all_stores(), None),
+                             ('partially_shared_opportunities', partially_shared(), 10),
+                             ('masked_conflicts', overrides.conflicts(), 10)):
+        results['counts'][key], results['examples'][key] = stream_list(report, key, items, keep)
+    print(f"Store files masked by /shared/: {masked_count} "
+          f"({results['counts']['masked_conflicts']} with different content)\n")
     
-    return categories, store_files, stores
+    # Files in 4-5 stores (counted only) and files unique to one store
+    results['counts']['different_content_most_stores'] = 0
+    results['store_specific'] = defaultdict(list)
+    for file_path in non_shared_paths:
+        stores_with_file = list(copies(file_path))
+        if 4 <= len(stores_with_file) < len(stores):
+            results['counts']['different_content_most_stores'] += 1
+        elif len(stores_with_file) == 1:
+            results['store_specific'][stores_with_file[0]].append(file_path)
+    report.write('store_specific_counts', {
+        store: len(results['store_specific'].get(store, []))
+        for store in stores
+    })
+    
+    results['store_totals'] = {store: sum(1 for _ in index.rows(store, include_shared=False))
+                               for store in stores}
+    report.write('summary', {
+        'total_nonshared_files': sum(results['store_totals'].values()),
+        'different_all_stores': results['counts']['different_content_all_stores'],
+        'different_most_stores': results['counts']['different_content_most_stores'],
+        'partially_shared': results['counts']['partially_shared_opportunities'],
+        'masked_conflicts': results['counts']['masked_conflicts']
+    })
+    
+    return results, stores
 
-def print_analysis_results(categories, store_files, stores):
+def print_analysis_results(results, stores):
     """Print formatted analysis results."""
+    counts = results['counts']
+    examples = results['examples']
     
     print("\n" + "=" * 60)
     print("NON-SHARED FILES ANALYSIS")
     print("=" * 60)
     
     # Files in all stores but different
-    print(f"\n1. FILES IN ALL STORES WITH DIFFERENT CONTENT ({len(categories['different_content_all_stores'])} files)")
+    print(f"\n1. FILES IN ALL STORES WITH DIFFERENT CONTENT ({counts['different_content_all_stores']} files)")
     print("-" * 60)
-    for item in sorted(categories['different_content_all_stores'], key=lambda x: x['file']):
+    for item in sorted(examples['different_content_all_stores'], key=lambda x: x['file']):
         print(f"\n  {item['file']}")
         sizes = item['sizes']
         min_size = min(sizes.values())
@@ -151,7 +147,7 @@ def print_analysis_results(categories, store_files, stores):
     print(f"\n2. STORE-SPECIFIC FILES (unique to individual stores)")
     print("-" * 60)
     for store in stores:
-        specific_files = categories['store_specific'].get(store, [])
+        specific_files = results['store_specific'].get(store, [])
         if specific_files:
             print(f"\n  {store.upper()} ({len(specific_files)} unique files):")
             
@@ -180,10 +176,10 @@ def print_analysis_results(categories, store_files, stores):
                     print(f"      ... and {len(files) - 5} more")
     
     # Partially shared files
-    if categories['partially_shared']:
+    if examples['partially_shared_opportunities']:
         print(f"\n3. PARTIALLY SHARED FILES (could potentially move to /shared/)")
         print("-" * 60)
-        for item in categories['partially_shared'][:10]:
+        for item in examples['partially_shared_opportunities']:
             print(f"  {item['file']}")
             print(f"    Present in: {', '.join(item['stores'])}")
     
@@ -192,17 +188,18 @@ def print_analysis_results(categories, store_files, stores):
     print("SUMMARY")
     print("=" * 60)
     
-    total_nonshared = sum(len(store_files[store]) for store in stores)
+    total_nonshared = sum(results['store_totals'].values())
     print(f"Total non-shared files across all stores: {total_nonshared}")
-    print(f"Files different in all stores: {len(categories['different_content_all_stores'])}")
-    print(f"Files different in most stores: {len(categories['different_content_most_stores'])}")
-    print(f"Partially shared (opportunity): {len(categories['partially_shared'])}")
+    print(f"Files different in all stores: {counts['different_content_all_stores']}")
+    print(f"Files different in most stores: {counts['different_content_most_stores']}")
+    print(f"Partially shared (opportunity): {counts['partially_shared_opportunities']}")
+    print(f"Masked by /shared/ with different content: {counts['masked_conflicts']}")
     
     # Store uniqueness
     print(f"\nStore Uniqueness Index:")
     for store in stores:
-        unique_count = len(categories['store_specific'].get(store, []))
-        total_count = len(store_files.get(store, {}))
+        unique_count = len(results['store_specific'].get(store, []))
+        total_count = results['store_totals'].get(store, 0)
         if total_count > 0:
             uniqueness = (unique_count / total_count) * 100
             print(f"  {store}: {unique_count} unique files ({uniqueness:.1f}% of non-shared)")
@@ -244,35 +241,20 @@ def identify_key_differences():
     print("  • Localized content and messaging")
 
 def main():
-    # Run analysis
-    categories, store_files, stores = analyze_nonshared_files()
+    # Stream detailed results without truncating the lists as they are found
+    # (--ndjson writes one record per line instead of a single JSON document)
+    output_file = report_path('nonshared_files_analysis.json', ndjson='--ndjson' in sys.argv)
+    with open_report(output_file) as report:
+        # Run analysis (--git reads blob SHAs from git instead of hashing)
+        results, stores = analyze_nonshared_files(report, use_git='--git' in sys.argv)
     
     # Print results
-    print_analysis_results(categories, store_files, stores)
+    print_analysis_results(results, stores)
     
     # Identify key differences
     identify_key_differences()
     
-    # Save detailed results
-    results = {
-        'summary': {
-            'total_nonshared_files': sum(len(store_files[store]) for store in stores),
-            'different_all_stores': len(categories['different_content_all_stores']),
-            'different_most_stores': len(categories['different_content_most_stores']),
-            'partially_shared': len(categories['partially_shared'])
-        },
-        'different_content_all_stores': categories['different_content_all_stores'][:20],
-        'store_specific_counts': {
-            store: len(categories['store_specific'].get(store, []))
-            for store in stores
-        },
-        'partially_shared_opportunities': categories['partially_shared'][:20]
-    }
-    
-    with open('nonshared_files_analysis.json', 'w') as f:
-        json.dump(results, f, indent=2)
-    
-    print(f"\nDetailed results saved to nonshared_files_analysis.json")
+    print(f"\nDetailed results saved to {output_file}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
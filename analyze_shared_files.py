@@ -1,110 +1,90 @@
 #!/usr/bin/env python3
 import os
-import hashlib
-import json
+import sys
 from pathlib import Path
 from collections import defaultdict
 
-def get_file_hash(filepath):
-    """Calculate SHA256 hash of a file."""
-    sha256_hash = hashlib.sha256()
-    try:
-        with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-    except Exception as e:
-        print(f"Error hashing {filepath}: {e}")
-        return None
+from analysis_db import AnalysisDB, print_sync_result
+from file_index import STORES, build_index
+from report_writer import open_report, report_path
 
-def analyze_themes(base_dir):
-    """Analyze all theme files and identify identical ones."""
-    stores = [
-        'build4less',
-        'tiles4less',
-        'building-supplies-online',
-        'insulation4less',
-        'insulation4us',
-        'roofing4us'
-    ]
-    
-    # Dictionary to store file hashes: {relative_path: {store: hash}}
-    file_hashes = defaultdict(dict)
-    
-    # Dictionary to store hash groups: {hash: {relative_path: [stores]}}
-    hash_groups = defaultdict(lambda: defaultdict(list))
+def analyze_themes(base_dir, shared_dir=None, manifest=None, use_git=False):
+    """Analyze all theme files and identify identical ones.
+
+    Files come from the single-pass file index. Copies are compared size
+    first, so only same-size files are hashed; the resulting content keys
+    are only comparable between copies of the same path. With use_git the
+    keys are git blob SHAs and only paths changed since the last run are
+    re-evaluated. /shared/ is scanned too so the database sync knows
+    which store files it masks; its files are not compared.
+    """
+    stores = list(STORES)
     
     print("Analyzing themes...")
     print("-" * 60)
     
-    for store in stores:
-        store_path = os.path.join(base_dir, store)
-        if not os.path.exists(store_path):
-            print(f"Warning: Store path not found: {store_path}")
-            continue
-            
-        print(f"Processing {store}...")
-        
-        for root, dirs, files in os.walk(store_path):
-            # Skip .git and node_modules
-            dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules']]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Get relative path from store root
-                relative_path = os.path.relpath(file_path, store_path).replace('\\', '/')
-                
-                # Calculate hash
-                file_hash = get_file_hash(file_path)
-                if file_hash:
-                    file_hashes[relative_path][store] = file_hash
-                    hash_groups[file_hash][relative_path].append(store)
-    
-    return file_hashes, hash_groups, stores
+    index = build_index(base_dir, shared_dir, stores=stores, manifest=manifest, full_hashes=False,
+                        use_git=use_git)
+    for store in index.missing_stores:
+        print(f"Warning: Store path not found: {os.path.join(base_dir, store)}")
+    
+    # Record this scan in the queryable database (see analysis_db.py)
+    with AnalysisDB() as db:
+        print_sync_result(f"files in {db.db_path}", db.sync_files(index))
+    
+    # Dictionary to store file content keys: {relative_path: {store: key}}
+    # (keys only identify content within one path, so there is no
+    # grouping by content across paths)
+    file_hashes = index.hashes_by_path()
+    
+    return file_hashes, stores
 
-def categorize_files(file_hashes, stores):
-    """Categorize files by how many stores they're identical across."""
+def categorize_files(file_hashes, stores, report):
+    """Categorize files by how many stores they're identical across.
+
+    Partial matches are streamed to report as they are found; the files
+    identical in all stores, the counts and a few 5-store examples are
+    returned.
+    """
     categories = {
         'all_stores': [],      # Files identical across all 6 stores
-        'five_stores': [],     # Files identical across 5 stores
-        'four_stores': [],     # Files identical across 4 stores
-        'three_stores': [],    # Files identical across 3 stores
-        'unique': []           # Files unique to specific stores
+        'counts': {},          # Partial matches per category
+        'five_store_examples': []
     }
     
+    def split_versions(store_hashes):
+        """{hash: [stores]} for a file in all stores with exactly 2 versions."""
+        if len(store_hashes) != len(stores) or len(set(store_hashes.values())) != 2:
+            return {}
+        hash_counts = defaultdict(list)
+        for store, hash_val in store_hashes.items():
+            hash_counts[hash_val].append(store)
+        return hash_counts
+    
     for relative_path, store_hashes in file_hashes.items():
-        # Get unique hashes for this file
-        unique_hashes = set(store_hashes.values())
-        
-        if len(unique_hashes) == 1 and len(store_hashes) == len(stores):
+        if len(set(store_hashes.values())) == 1 and len(store_hashes) == len(stores):
             # Same hash in all stores
             categories['all_stores'].append(relative_path)
-        elif len(store_hashes) == len(stores):
-            # File exists in all stores but with different content
-            if len(unique_hashes) == 2:
-                # Find which stores have which version
-                hash_counts = defaultdict(list)
-                for store, hash_val in store_hashes.items():
-                    hash_counts[hash_val].append(store)
-                
-                for hash_val, store_list in hash_counts.items():
-                    if len(store_list) == 5:
-                        categories['five_stores'].append({
-                            'file': relative_path,
-                            'identical_in': store_list,
-                            'different_in': [s for s in stores if s not in store_list]
-                        })
-                    elif len(store_list) == 4:
-                        categories['four_stores'].append({
-                            'file': relative_path,
-                            'identical_in': store_list,
-                            'different_in': [s for s in stores if s not in store_list]
-                        })
-                    elif len(store_list) == 3:
-                        categories['three_stores'].append({
-                            'file': relative_path,
-                            'identical_in': store_list
-                        })
+    
+    # Files in all stores with two versions, one of them shared by 5 or 4 stores
+    report.begin_object('partial_matches')
+    for key, store_count in (('five_stores', 5), ('four_stores', 4)):
+        report.begin_list(key)
+        categories['counts'][key] = 0
+        for relative_path, store_hashes in file_hashes.items():
+            for hash_val, store_list in split_versions(store_hashes).items():
+                if len(store_list) == store_count:
+                    item = {
+                        'file': relative_path,
+                        'identical_in': store_list,
+                        'different_in': [s for s in stores if s not in store_list]
+                    }
+                    report.add(item)
+                    categories['counts'][key] += 1
+                    if key == 'five_stores' and len(categories['five_store_examples']) < 10:
+                        categories['five_store_examples'].append(item)
+        report.end()
+    report.end()
     
     return categories
 
@@ -136,15 +116,27 @@ def organize_by_type(files):
 
 def main():
     base_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
     
-    # Analyze themes
-    file_hashes, hash_groups, stores = analyze_themes(base_dir)
+    # Analyze themes (--git reads blob SHAs from git instead of hashing)
+    file_hashes, stores = analyze_themes(base_dir, shared_dir, use_git='--git' in sys.argv)
     
-    # Categorize files
-    categories = categorize_files(file_hashes, stores)
-    
-    # Organize files identical across all stores by type
-    all_stores_by_type = organize_by_type(categories['all_stores'])
+    # Stream detailed results, including every partial match, as they are
+    # found (--ndjson writes one record per line instead of a single JSON document)
+    output_file = report_path('shared_files_analysis.json', ndjson='--ndjson' in sys.argv)
+    with open_report(output_file) as report:
+        # Categorize files
+        categories = categorize_files(file_hashes, stores, report)
+        
+        # Organize files identical across all stores by type
+        all_stores_by_type = organize_by_type(categories['all_stores'])
+        report.write('shared_candidates', all_stores_by_type)
+        report.write('summary', {
+            'total_files': len(file_hashes),
+            'identical_all_stores': len(categories['all_stores']),
+            'identical_5_stores': categories['counts']['five_stores'],
+            'identical_4_stores': categories['counts']['four_stores']
+        })
     
     # Print results
     print("\n" + "=" * 60)
@@ -153,8 +145,8 @@ def main():
     
     print(f"\nTotal unique files analyzed: {len(file_hashes)}")
     print(f"Files identical across ALL 6 stores: {len(categories['all_stores'])}")
-    print(f"Files identical across 5 stores: {len(categories['five_stores'])}")
-    print(f"Files identical across 4 stores: {len(categories['four_stores'])}")
+    print(f"Files identical across 5 stores: {categories['counts']['five_stores']}")
+    print(f"Files identical across 4 stores: {categories['counts']['four_stores']}")
     
     print("\n" + "-" * 60)
     print("FILES IDENTICAL ACROSS ALL 6 STORES (Prime /shared/ candidates)")
@@ -174,32 +166,14 @@ def main():
     print(f"\nPOTENTIAL IMPACT:")
     print(f"Moving {total_shared_files} shared files would eliminate {potential_savings} duplicate files")
     
-    # Save detailed results to JSON
-    results = {
-        'summary': {
-            'total_files': len(file_hashes),
-            'identical_all_stores': len(categories['all_stores']),
-            'identical_5_stores': len(categories['five_stores']),
-            'identical_4_stores': len(categories['four_stores'])
-        },
-        'shared_candidates': all_stores_by_type,
-        'partial_matches': {
-            'five_stores': categories['five_stores'][:20],  # First 20 examples
-            'four_stores': categories['four_stores'][:20]   # First 20 examples
-        }
-    }
-    
-    with open('shared_files_analysis.json', 'w') as f:
-        json.dump(results, f, indent=2)
-    
-    print("\nDetailed results saved to shared_files_analysis.json")
+    print(f"\nDetailed results saved to {output_file}")
     
     # Print files that are nearly universal (5 stores)
-    if categories['five_stores']:
+    if categories['five_store_examples']:
         print("\n" + "-" * 60)
         print("FILES IDENTICAL IN 5 STORES (Consider for /shared/ with override)")
         print("-" * 60)
-        for item in categories['five_stores'][:10]:
+        for item in categories['five_store_examples']:
             print(f"  - {item['file']}")
             print(f"    Different in: {', '.join(item['different_in'])}")
 
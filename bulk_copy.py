@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Parallel, verified bulk copier used to promote files into /shared/.
+
+All destination directories are created up front, then files are copied
+on a thread pool with os.copy_file_range (or sendfile) where available.
+Destinations whose content already matches the source are skipped, and
+every copy is written to a temporary file and checked by hash before it
+replaces the destination. Hashes come from the persistent manifest, so a
+re-run over unchanged files only stats them.
+
+promote() wraps a bulk copy in a transaction: the new tree is staged in a
+sibling directory and published with one atomic directory swap, so readers
+never see a half-updated tree.
+"""
+
+import os
+import sys
+import json
+import errno
+import ctypes
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from file_manifest import FileManifest
+from file_hashing import default_workers, hash_file
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+STAGING_SUFFIX = '.staging'
+RENAME_EXCHANGE = 2  # renameat2 flag: swap two paths atomically
+AT_FDCWD = -100
+
+
+def copy_file_data(source, destination):
+    """Copy file contents with the fastest method the platform offers."""
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        for method in ('copy_file_range', 'sendfile'):
+            copy = getattr(os, method, None)
+            if copy is None:
+                continue
+            try:
+                while remaining > 0:
+                    if method == 'copy_file_range':
+                        copied = copy(src.fileno(), dst.fileno(), min(remaining, COPY_CHUNK_SIZE))
+                    else:
+                        copied = copy(dst.fileno(), src.fileno(), None, min(remaining, COPY_CHUNK_SIZE))
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+            except OSError:
+                # Not supported between these files; start over with the next method
+                pass
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+            remaining = os.fstat(src.fileno()).st_size
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+
+def copy_verified(source, destination, expected_hash):
+    """Copy source over destination via a temp file; return None or an error message."""
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    try:
+        copy_file_data(source, tmp_path)
+        shutil.copystat(source, tmp_path)
+        if hash_file(tmp_path) != expected_hash:
+            os.remove(tmp_path)
+            return "verification failed: copied content does not match the source"
+        os.replace(tmp_path, destination)
+        return None
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return str(e)
+
+
+def bulk_copy(pairs, manifest=None, workers=None):
+    """Copy (source, destination) pairs and return {'copied', 'unchanged', 'missing', 'failed'}.
+
+    'failed' holds (destination, error) tuples; the other keys hold destinations.
+    """
+    if manifest is None:
+        manifest = FileManifest()
+    pairs = list(pairs)
+    results = {'copied': [], 'unchanged': [], 'missing': [], 'failed': []}
+
+    present = [(source, destination) for source, destination in pairs if os.path.isfile(source)]
+    results['missing'] = [destination for source, destination in pairs if not os.path.isfile(source)]
+
+    source_hashes = manifest.get_hashes(source for source, _ in present)
+    existing = [destination for _, destination in present if os.path.isfile(destination)]
+    destination_hashes = manifest.get_hashes(existing)
+
+    to_copy = []
+    for source, destination in present:
+        source_hash = source_hashes.get(source)
+        if source_hash is None:
+            results['failed'].append((destination, "source could not be read"))
+        elif destination_hashes.get(destination) == source_hash:
+            results['unchanged'].append(destination)
+        else:
+            to_copy.append((source, destination, source_hash))
+
+    for directory in sorted({os.path.dirname(destination) for _, destination, _ in to_copy}):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    if workers is None:
+        workers = default_workers(len(to_copy))
+    copy_task = lambda task: copy_verified(*task)
+    if workers <= 1:
+        errors = [copy_task(task) for task in to_copy]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            errors = list(executor.map(copy_task, to_copy))
+
+    for (_, destination, source_hash), error in zip(to_copy, errors):
+        if error:
+            results['failed'].append((destination, error))
+        else:
+            manifest.record(destination, os.stat(destination), source_hash)
+            results['copied'].append(destination)
+
+    manifest.save()
+    return results
+
+
+def exchange_paths(path_a, path_b):
+    """Atomically swap two existing paths; return False where that isn't supported."""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    result = renameat2(AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE)
+    if result != 0:
+        error = ctypes.get_errno()
+        if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+            return False
+        raise OSError(error, os.strerror(error), path_a)
+    return True
+
+
+def fsync_path(path):
+    """Flush a file or directory to disk."""
+    flags = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) if os.path.isdir(path) else os.O_RDONLY
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return  # Directories can't be opened on Windows; their entries are flushed with the files
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def link_tree(source_dir, target_dir):
+    """Recreate source_dir at target_dir using hardlinks, copying where links fail.
+
+    Returns every directory created, so their entries can be flushed.
+    """
+    created = []
+    for root, dirs, files in os.walk(source_dir):
+        target_root = os.path.normpath(os.path.join(target_dir, os.path.relpath(root, source_dir)))
+        os.makedirs(target_root, exist_ok=True)
+        created.append(target_root)
+        for name in files:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+    return created
+
+
+def promote(sources, target_dir, metadata=None, manifest=None, workers=None):
+    """Publish {relative path: source} into target_dir as one atomic update.
+
+    Files already up to date in target_dir are left alone, and nothing is
+    published if no file or metadata file ({relative path: JSON data})
+    changed; sources that don't exist are reported as missing and leave
+    their target alone. Otherwise the current tree is hardlinked into a
+    sibling staging directory, the changed files and metadata are written
+    over it (each write replaces its link, so the live tree is never
+    written), everything written is fsynced in one batch, and the staging
+    directory is swapped with target_dir. Returns results shaped like bulk_copy's, with target_dir paths.
+    """
+    if manifest is None:
+        manifest = FileManifest()
+    target_dir = os.path.normpath(target_dir)
+    staging_dir = target_dir + STAGING_SUFFIX
+
+    source_hashes = manifest.get_hashes(sources.values())
+    targets = {rel_path: os.path.join(target_dir, rel_path) for rel_path in sources}
+    target_hashes = manifest.get_hashes(path for path in targets.values() if os.path.isfile(path))
+    # A missing source is reported, not restaged: it leaves its target as it is
+    missing = [targets[rel_path] for rel_path, source in sources.items()
+               if source_hashes.get(source) is None]
+    changed = {rel_path: source for rel_path, source in sources.items()
+               if source_hashes.get(source) is not None
+               and target_hashes.get(targets[rel_path]) != source_hashes[source]}
+    unchanged = [targets[rel_path] for rel_path, source in sources.items()
+                 if rel_path not in changed and source_hashes.get(source) is not None]
+
+    metadata_text = {rel_path: json.dumps(data, indent=2) for rel_path, data in (metadata or {}).items()}
+    changed_metadata = {}
+    for rel_path, text in metadata_text.items():
+        try:
+            with open(os.path.join(target_dir, rel_path), 'r') as f:
+                if f.read() == text:
+                    continue
+        except OSError:
+            pass
+        changed_metadata[rel_path] = text
+
+    if not changed and not changed_metadata:
+        return {'copied': [], 'unchanged': unchanged, 'missing': missing, 'failed': []}
+
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)  # Left behind by an interrupted promotion
+    if os.path.isdir(target_dir):
+        linked_dirs = link_tree(target_dir, staging_dir)
+    else:
+        os.makedirs(staging_dir)
+        linked_dirs = [staging_dir]
+
+    pairs = [(source, os.path.join(staging_dir, rel_path)) for rel_path, source in changed.items()]
+    results = bulk_copy(pairs, manifest=manifest, workers=workers)
+    if results['failed']:
+        shutil.rmtree(staging_dir)
+        results['failed'] = [(os.path.join(target_dir, os.path.relpath(path, staging_dir)), error)
+                             for path, error in results['failed']]
+        return results
+
+    written = list(results['copied'])
+    for rel_path, text in changed_metadata.items():
+        path = os.path.join(staging_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Replace the staged hardlink rather than writing through it into
+        # the live file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        written.append(path)
+
+    # One batch of fsyncs before publishing instead of one per copy. Every
+    # staged directory is included: link_tree fills some with links only,
+    # and copies may have created parents that hold no files of their own
+    directories = set(linked_dirs) | {staging_dir}
+    for path in written:
+        directory = os.path.dirname(path)
+        while directory not in directories and directory.startswith(staging_dir + os.sep):
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+    paths = written + sorted(directories, key=len, reverse=True)
+    if workers is None:
+        workers = default_workers(len(paths))
+    if workers <= 1:
+        for path in paths:
+            fsync_path(path)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fsync_path, paths))
+
+    if not os.path.exists(target_dir):
+        os.rename(staging_dir, target_dir)
+    elif exchange_paths(staging_dir, target_dir):
+        shutil.rmtree(staging_dir)  # Now holds the previous tree
+    else:
+        # No atomic exchange here: the target is briefly missing, but never torn
+        retired_dir = target_dir + '.old'
+        if os.path.exists(retired_dir):
+            shutil.rmtree(retired_dir)
+        os.rename(target_dir, retired_dir)
+        os.rename(staging_dir, target_dir)
+        shutil.rmtree(retired_dir)
+    fsync_path(os.path.dirname(os.path.abspath(target_dir)))
+
+    # Report published paths; cached hashes follow the copies there
+    published = lambda path: os.path.join(target_dir, os.path.relpath(path, staging_dir))
+    for staged in results['copied']:
+        manifest.move(staged, published(staged))
+    manifest.save()
+    return {
+        'copied': [published(path) for path in results['copied']],
+        'unchanged': unchanged + [published(path) for path in results['unchanged']],
+        'missing': missing + [published(path) for path in results['missing']],
+        'failed': []
+    }
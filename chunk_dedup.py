@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Chunk-level deduplication report across all stores.
+
+Every distinct file in themes/* is split with content-defined chunking
+(FastCDC-style gear hash with normalized chunking), so an edit only changes
+the chunks around it. Counting each distinct chunk once shows how many bytes
+are really unique, compared to counting each distinct file once. The gap
+is what a chunk-level shared layer could save.
+"""
+
+import sys
+import json
+import hashlib
+from collections import defaultdict
+
+from file_index import STORES, build_index
+
+MIN_CHUNK = 512       # No cut point before this many bytes
+NORMAL_CHUNK = 2048   # Target chunk size
+MAX_CHUNK = 8192      # Forced cut point
+
+MASK_64 = (1 << 64) - 1
+# Normalized chunking: a stricter mask before the target size and a looser
+# one after it, so chunk sizes cluster around NORMAL_CHUNK. The masks use
+# the high bits, which depend on the most recent 64 bytes.
+MASK_STRICT = ((1 << 13) - 1) << (64 - 13)
+MASK_LOOSE = ((1 << 9) - 1) << (64 - 9)
+
+# Fixed pseudo-random gear table, so cut points are stable between runs
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big') for i in range(256)]
+
+
+def cut_point(data, start, end):
+    """Return the end offset of the chunk that starts at start."""
+    remaining = end - start
+    if remaining <= MIN_CHUNK:
+        return end
+    normal = start + min(NORMAL_CHUNK, remaining)
+    limit = start + min(MAX_CHUNK, remaining)
+
+    gear = GEAR
+    fingerprint = 0
+    i = start + MIN_CHUNK
+    while i < normal:
+        fingerprint = ((fingerprint << 1) + gear[data[i]]) & MASK_64
+        i += 1
+        if not fingerprint & MASK_STRICT:
+            return i
+    while i < limit:
+        fingerprint = ((fingerprint << 1) + gear[data[i]]) & MASK_64
+        i += 1
+        if not fingerprint & MASK_LOOSE:
+            return i
+    return limit
+
+
+def chunk_file(filepath):
+    """Return [(chunk digest, size)] for a file, or None if it cannot be read."""
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Error reading {filepath}: {e}")
+        return None
+
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = cut_point(data, start, len(data))
+        chunks.append((hashlib.sha256(data[start:end]).hexdigest(), end - start))
+        start = end
+    return chunks
+
+
+def file_type(rel_path):
+    """Report bucket for a theme path: its top-level directory."""
+    return rel_path.split('/', 1)[0] if '/' in rel_path else 'other'
+
+
+def analyze_chunks(themes_dir, stores=STORES, use_git=False):
+    """Return {file type: byte counts} plus an 'all' total over every store."""
+    index = build_index(themes_dir, stores=stores, use_git=use_git)
+
+    # Identical files are chunked once
+    chunks_by_hash = {}
+    stats = defaultdict(lambda: {'files': 0, 'total_bytes': 0, 'file_unique_bytes': 0,
+                                 'chunk_unique_bytes': 0, 'chunks': 0})
+    seen_files = defaultdict(set)   # type -> file hashes already counted
+    seen_chunks = defaultdict(set)  # type -> chunk digests already counted
+
+    for row in index.rows():
+        file_hash = index.hash_col[row]
+        size = index.size_col[row]
+        if file_hash not in chunks_by_hash:
+            chunks_by_hash[file_hash] = chunk_file(index.full_path_col[row])
+        chunks = chunks_by_hash[file_hash]
+        if chunks is None:
+            continue
+
+        for bucket in (file_type(index.path_col[row]), 'all'):
+            bucket_stats = stats[bucket]
+            bucket_stats['files'] += 1
+            bucket_stats['total_bytes'] += size
+            if file_hash in seen_files[bucket]:
+                continue
+            seen_files[bucket].add(file_hash)
+            bucket_stats['file_unique_bytes'] += size
+            for digest, chunk_size in chunks:
+                bucket_stats['chunks'] += 1
+                if digest not in seen_chunks[bucket]:
+                    seen_chunks[bucket].add(digest)
+                    bucket_stats['chunk_unique_bytes'] += chunk_size
+
+    print(f"Chunked {len(chunks_by_hash)} distinct files")
+    return dict(stats)
+
+
+def print_report(stats):
+    """Print unique vs repeated bytes per file type."""
+    print("\n" + "=" * 78)
+    print("CHUNK-LEVEL DEDUPLICATION")
+    print("=" * 78)
+    print(f"{'Type':<12}{'Files':>7}{'Total':>12}{'Unique files':>15}{'Unique chunks':>16}"
+          f"{'Chunk saving':>16}")
+    print("-" * 78)
+    for bucket in sorted(stats, key=lambda name: (name == 'all', name)):
+        item = stats[bucket]
+        saving = item['file_unique_bytes'] - item['chunk_unique_bytes']
+        percent = saving / item['file_unique_bytes'] * 100 if item['file_unique_bytes'] else 0
+        print(f"{bucket:<12}{item['files']:>7}{item['total_bytes']:>12,}{item['file_unique_bytes']:>15,}"
+              f"{item['chunk_unique_bytes']:>16,}{saving:>10,} ({percent:4.1f}%)")
+    print("\nUnique files: bytes left after storing each distinct file once")
+    print("Unique chunks: bytes left after storing each distinct chunk once")
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+
+    # --git reads blob SHAs from git instead of hashing
+    stats = analyze_chunks(themes_dir, use_git='--git' in sys.argv)
+    print_report(stats)
+
+    with open('chunk_dedup_analysis.json', 'w') as f:
+        json.dump({
+            'chunking': {'min': MIN_CHUNK, 'normal': NORMAL_CHUNK, 'max': MAX_CHUNK},
+            'by_type': stats
+        }, f, indent=2)
+
+    print(f"\nDetailed results saved to chunk_dedup_analysis.json")
+
+
+if __name__ == "__main__":
+    main()
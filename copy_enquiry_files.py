@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import os
-import shutil
 from pathlib import Path
 
+from bulk_copy import bulk_copy
+
 def copy_enquiry_files():
     """Copy all enquiry system files from build4less to shared folder."""
     
@@ -50,25 +51,28 @@ def copy_enquiry_files():
     skipped_count = 0
     total_size = 0
     
+    # Copy everything in one parallel, verified batch
+    destinations = {file_path: os.path.join(shared_dir, file_path) for file_path in files_to_copy}
+    results = bulk_copy((os.path.join(source_dir, file_path), destination)
+                        for file_path, destination in destinations.items())
+    copied = set(results['copied'])
+    unchanged = set(results['unchanged'])
+    failed = dict(results['failed'])
+    
     for file_path, description in files_to_copy.items():
-        source = os.path.join(source_dir, file_path)
-        destination = os.path.join(shared_dir, file_path)
-        
-        if os.path.exists(source):
-            # Create destination directory if needed
-            dest_dir = os.path.dirname(destination)
-            if dest_dir and not os.path.exists(dest_dir):
-                os.makedirs(dest_dir)
-            
-            # Copy the file
-            shutil.copy2(source, destination)
-            file_size = os.path.getsize(source)
+        destination = destinations[file_path]
+        if destination in copied or destination in unchanged:
+            file_size = os.path.getsize(destination)
             total_size += file_size
             copied_count += 1
             
-            print(f"[OK] Copied: {file_path}")
+            status = "Copied" if destination in copied else "Up to date"
+            print(f"[OK] {status}: {file_path}")
             print(f"     Description: {description}")
             print(f"     Size: {file_size:,} bytes")
+        elif destination in failed:
+            print(f"[ERROR] Error copying {file_path}: {failed[destination]}")
+            skipped_count += 1
         else:
             print(f"[SKIP] Not found: {file_path}")
             skipped_count += 1
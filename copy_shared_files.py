@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 import os
 import json
-import shutil
 from pathlib import Path
 
+from bulk_copy import promote
+
 def copy_shared_files():
-    """Copy all identical files to the shared folder."""
+    """Copy all identical files to the shared folder.
+
+    The new /shared/ is staged next to the live one and swapped in atomically
+    together with SHARED_FILES_INFO.json, so an interrupted run never leaves
+    a half-updated shared layer behind.
+    """
     
     # Load the analysis results
     with open('shared_files_analysis.json', 'r') as f:
@@ -17,46 +23,18 @@ def copy_shared_files():
     print("Copying shared files from build4less to /shared/ folder...")
     print("-" * 60)
     
-    total_files = 0
-    copied_files = 0
-    
-    # Process each category of files
+    # Collect every file first, then publish them in one transaction
+    sources = {}
     for category, files in shared_candidates.items():
         if not files:
             continue
-            
-        print(f"\nProcessing {category.upper()}: {len(files)} files")
-        
+        print(f"Queued {category.upper()}: {len(files)} files")
         for file_path in files:
-            total_files += 1
-            source = os.path.join('themes', source_store, file_path)
-            destination = os.path.join('shared', file_path)
-            
-            try:
-                # Create destination directory if it doesn't exist
-                dest_dir = os.path.dirname(destination)
-                if dest_dir and not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir)
-                
-                # Copy the file
-                if os.path.exists(source):
-                    shutil.copy2(source, destination)
-                    copied_files += 1
-                    if copied_files <= 10 or copied_files % 50 == 0:
-                        print(f"  [OK] Copied: {file_path}")
-                else:
-                    print(f"  [WARN] Source not found: {source}")
-                    
-            except Exception as e:
-                print(f"  [ERROR] Error copying {file_path}: {e}")
-    
-    print("\n" + "=" * 60)
-    print(f"COMPLETED: Copied {copied_files} of {total_files} files to /shared/")
-    print("=" * 60)
+            sources[file_path] = os.path.join('themes', source_store, file_path)
     
     # Create a summary file
     summary = {
-        'total_shared_files': copied_files,
+        'total_shared_files': sum(1 for source in sources.values() if os.path.isfile(source)),
         'source_store': source_store,
         'categories': {}
     }
@@ -65,8 +43,29 @@ def copy_shared_files():
         if files:
             summary['categories'][category] = len(files)
     
-    with open('shared/SHARED_FILES_INFO.json', 'w') as f:
-        json.dump(summary, f, indent=2)
+    results = promote(sources, 'shared', metadata={'SHARED_FILES_INFO.json': summary})
+    
+    for i, destination in enumerate(results['copied']):
+        if i < 10 or (i + 1) % 50 == 0:
+            print(f"  [OK] Copied: {os.path.relpath(destination, 'shared')}")
+    for destination in results['missing']:
+        print(f"  [WARN] Source not found: {os.path.join('themes', source_store, os.path.relpath(destination, 'shared'))}")
+    for destination, error in results['failed']:
+        print(f"  [ERROR] Error copying {os.path.relpath(destination, 'shared')}: {error}")
+    
+    if results['failed']:
+        print("\n" + "=" * 60)
+        print(f"FAILED: /shared/ was left unchanged ({len(results['failed'])} files could not be copied)")
+        print("=" * 60)
+        return
+    
+    total_files = len(sources)
+    copied_files = len(results['copied']) + len(results['unchanged'])
+    
+    print("\n" + "=" * 60)
+    print(f"COMPLETED: {copied_files} of {total_files} files in /shared/ "
+          f"({len(results['copied'])} copied, {len(results['unchanged'])} already up to date)")
+    print("=" * 60)
     
     print("\nSummary saved to shared/SHARED_FILES_INFO.json")
     print("\nNext steps:")
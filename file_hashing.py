@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Parallel file hashing shared by all analyzers.
+
+hashlib releases the GIL while digesting large buffers, so a thread pool is
+enough to keep every core busy during a cold scan of all stores.
+"""
+
+import os
+import mmap
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+READ_BUFFER_SIZE = 1024 * 1024     # 1 MiB reads for regular files
+MMAP_THRESHOLD = 8 * 1024 * 1024   # Files this large are hashed through mmap
+FILES_PER_WORKER = 16              # Below this many files a worker isn't worth it
+PARTIAL_BLOCK_SIZE = 4096          # Bytes read from each end for a partial hash
+
+
+def hash_file(filepath, algorithm='sha256'):
+    """Calculate the hex digest of a file, or None if it cannot be read."""
+    hasher = hashlib.new(algorithm)
+    try:
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            else:
+                for block in iter(lambda: f.read(READ_BUFFER_SIZE), b''):
+                    hasher.update(block)
+        return hasher.hexdigest()
+    except (OSError, ValueError) as e:
+        print(f"Error hashing {filepath}: {e}")
+        return None
+
+
+def partial_hash(filepath, block_size=PARTIAL_BLOCK_SIZE, algorithm='sha256'):
+    """Hash only the first and last block of a file, or None if it cannot be read.
+
+    Two files with different partial hashes are certainly different; equal
+    partial hashes still need a full hash to prove the files are identical.
+    """
+    hasher = hashlib.new(algorithm)
+    try:
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            hasher.update(f.read(block_size))
+            if size > block_size:
+                f.seek(max(block_size, size - block_size))
+                hasher.update(f.read(block_size))
+        return hasher.hexdigest()
+    except OSError as e:
+        print(f"Error hashing {filepath}: {e}")
+        return None
+
+
+def git_blob_hash(filepath):
+    """Calculate the git blob SHA-1 of a file, as `git hash-object` would."""
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Error hashing {filepath}: {e}")
+        return None
+    hasher = hashlib.sha1(b'blob %d\0' % len(data))
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def default_workers(file_count):
+    """Pick a worker count from the CPU count and the amount of work."""
+    max_workers = min(32, (os.cpu_count() or 1) + 4)
+    return max(1, min(max_workers, file_count // FILES_PER_WORKER))
+
+
+def _map_files(func, filepaths, workers):
+    """Apply func to every path, on a thread pool when there is enough work."""
+    filepaths = list(filepaths)
+    if workers is None:
+        workers = default_workers(len(filepaths))
+
+    if workers <= 1:
+        digests = [func(path) for path in filepaths]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            digests = list(executor.map(func, filepaths))
+
+    return {path: digest for path, digest in zip(filepaths, digests) if digest}
+
+
+def hash_files(filepaths, algorithm='sha256', workers=None):
+    """Hash many files concurrently and return {filepath: hexdigest}.
+
+    Files that cannot be read are left out of the result.
+    """
+    return _map_files(lambda path: hash_file(path, algorithm), filepaths, workers)
+
+
+def partial_hash_files(filepaths, workers=None):
+    """Partial-hash many files concurrently and return {filepath: hexdigest}."""
+    return _map_files(partial_hash, filepaths, workers)
+
+
+def git_blob_hash_files(filepaths, workers=None):
+    """Git-blob-hash many files concurrently and return {filepath: sha1}."""
+    return _map_files(git_blob_hash, filepaths, workers)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Single-pass scanner that builds one file index for every store and /shared/.
+
+Each tree is walked once with os.scandir and the results are kept in a
+columnar index (one list per field, one row per store/path pair). The
+analyzers query the index instead of running their own os.walk.
+"""
+
+import os
+from collections import defaultdict
+
+from file_manifest import FileManifest
+from file_hashing import PARTIAL_BLOCK_SIZE
+from git_changes import GitSnapshot, find_repo_root
+
+STORES = [
+    'build4less',
+    'tiles4less',
+    'building-supplies-online',
+    'insulation4less',
+    'insulation4us',
+    'roofing4us'
+]
+
+SHARED = 'shared'                            # Pseudo-store name for /shared/ rows
+SKIP_DIRS = {'.git', 'node_modules'}
+SHARED_METADATA = {'SHARED_FILES_INFO.json'}  # Lives in /shared/ but isn't a theme file
+
+# What the hash column holds (FileIndex.hash_kind)
+HASH_SHA256 = 'sha256'            # Full SHA-256 from the manifest
+HASH_GIT_BLOB = 'git-blob'        # Git blob SHA from the git snapshot
+HASH_CONTENT_KEY = 'content-key'  # Tiered keys, only comparable within one path
+
+
+def scan_tree(root_dir):
+    """Yield (relative_path, full_path, stat) for every file under root_dir."""
+    stack = [(root_dir, '')]
+    while stack:
+        current_dir, prefix = stack.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Error scanning {current_dir}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append((entry.path, prefix + entry.name + '/'))
+            elif entry.is_file():
+                yield prefix + entry.name, entry.path, entry.stat()
+        # Reversed so directories are visited in name order
+        stack.extend(reversed(subdirs))
+
+
+class FileIndex:
+    """Columnar index of (store, path, size, hash, shared) rows."""
+
+    def __init__(self, stores):
+        self.stores = list(stores)
+        self.missing_stores = []
+        self.hash_kind = None
+        self.store_col = []
+        self.path_col = []
+        self.size_col = []
+        self.hash_col = []
+        self.shared_col = []
+        self.full_path_col = []
+        self._rows = {}  # (store, path) -> row number
+
+    def __len__(self):
+        return len(self.path_col)
+
+    def add(self, store, rel_path, full_path, size, file_hash, shared):
+        self._rows[(store, rel_path)] = len(self.path_col)
+        self.store_col.append(store)
+        self.path_col.append(rel_path)
+        self.size_col.append(size)
+        self.hash_col.append(file_hash)
+        self.shared_col.append(shared)
+        self.full_path_col.append(full_path)
+
+    def rows(self, store=None, include_shared=True):
+        """Yield row numbers, optionally limited to one store or to non-shared paths."""
+        for row, row_store in enumerate(self.store_col):
+            if store is not None and row_store != store:
+                continue
+            if not include_shared and self.shared_col[row]:
+                continue
+            yield row
+
+    def get(self, store, rel_path):
+        """Return the row number for a store/path pair, or None."""
+        return self._rows.get((store, rel_path))
+
+    def shared_files(self):
+        """Relative paths present in /shared/."""
+        return {self.path_col[row] for row in self.rows(SHARED)}
+
+    def store_files(self, include_shared=True):
+        """{store: {path: hash}} for the theme stores."""
+        result = defaultdict(dict)
+        for store in self.stores:
+            for row in self.rows(store, include_shared):
+                result[store][self.path_col[row]] = self.hash_col[row]
+        return result
+
+    def hashes_by_path(self, include_shared=True):
+        """{path: {store: hash}} for the theme stores."""
+        result = defaultdict(dict)
+        for store in self.stores:
+            for row in self.rows(store, include_shared):
+                result[self.path_col[row]][store] = self.hash_col[row]
+        return result
+
+    def sizes_by_path(self, include_shared=True):
+        """{path: {store: size}} for the theme stores."""
+        result = defaultdict(dict)
+        for store in self.stores:
+            for row in self.rows(store, include_shared):
+                result[self.path_col[row]][store] = self.size_col[row]
+        return result
+
+    def presence(self, include_shared=True):
+        """{path: [stores that have it]} in store order."""
+        result = defaultdict(list)
+        for store in self.stores:
+            for row in self.rows(store, include_shared):
+                result[self.path_col[row]].append(store)
+        return result
+
+
+def tiered_content_keys(scanned, manifest):
+    """Return ({full_path: content key}, tier counts) reading as little as possible.
+
+    Files are only ever compared with copies at the same relative path, so:
+      1. a copy whose size no other copy shares is keyed by its size alone;
+      2. same-size copies are keyed by a partial hash of their first and last
+         block when that already tells them apart (cached in the manifest);
+      3. only copies that still collide get a full SHA-256 (via the manifest).
+    Equal keys mean equal content; keys are only comparable within one path.
+    """
+    size_groups = defaultdict(list)  # (relative_path, size) -> [full_path]
+    for _, rel_path, full_path, size in scanned:
+        size_groups[(rel_path, size)].append(full_path)
+
+    keys = {}
+    tiers = {'size': 0, 'partial': 0, 'full': 0}
+    needs_partial = []
+    needs_full = []
+    for (_, size), paths in size_groups.items():
+        if len(paths) == 1:
+            keys[paths[0]] = f'size:{size}'
+            tiers['size'] += 1
+        elif size <= 2 * PARTIAL_BLOCK_SIZE or all(manifest.lookup(path) for path in paths):
+            # A partial hash would read the whole file anyway, or the
+            # full hashes are already cached
+            needs_full.extend(paths)
+        else:
+            needs_partial.append(paths)
+
+    partials = manifest.get_partial_hashes(path for paths in needs_partial for path in paths)
+    for paths in needs_partial:
+        partial_groups = defaultdict(list)
+        for path in paths:
+            if path in partials:
+                partial_groups[partials[path]].append(path)
+        for digest, same_partial in partial_groups.items():
+            if len(same_partial) == 1:
+                keys[same_partial[0]] = f'partial:{digest}'
+                tiers['partial'] += 1
+            else:
+                needs_full.extend(same_partial)
+
+    full_hashes = manifest.get_hashes(needs_full)
+    keys.update(full_hashes)
+    tiers['full'] += len(full_hashes)
+    return keys, tiers
+
+
+def scan_git(trees, repo_dir):
+    """Return (scanned rows, {full_path: blob sha}, re-evaluated count) from the git snapshot."""
+    snapshot = GitSnapshot(repo_dir)
+    files = snapshot.refresh()
+
+    prefixes = []
+    for store, tree_dir in trees:
+        prefix = os.path.relpath(tree_dir, repo_dir).replace('\\', '/').rstrip('/') + '/'
+        prefixes.append((prefix, store, tree_dir))
+
+    scanned = []
+    hashes = {}
+    for repo_path in sorted(files):
+        for prefix, store, tree_dir in prefixes:
+            if not repo_path.startswith(prefix):
+                continue
+            rel_path = repo_path[len(prefix):]
+            if SKIP_DIRS.intersection(rel_path.split('/')[:-1]):
+                break
+            full_path = os.path.join(tree_dir, rel_path)
+            blob_sha, size = files[repo_path]
+            scanned.append((store, rel_path, full_path, size))
+            hashes[full_path] = blob_sha
+            break
+    return scanned, hashes, snapshot.reevaluated
+
+
+def build_index(themes_dir, shared_dir=None, stores=STORES, manifest=None, verbose=True,
+                full_hashes=True, use_git=False):
+    """Scan /shared/ and every store once and return a FileIndex.
+
+    Hashes come from the persistent manifest, so unchanged files are not read.
+    With full_hashes=False the hash column holds tiered content keys instead
+    (see tiered_content_keys), which is enough to compare copies of a path
+    across stores and avoids hashing files whose size already differs.
+    With use_git=True the hash column holds git blob SHAs taken from the git
+    snapshot (see git_changes), and only paths changed since the last run
+    are looked at again.
+    """
+    repo_dir = find_repo_root(themes_dir) if use_git else None
+    if use_git and repo_dir is None:
+        print(f"Warning: {themes_dir} is not in a git checkout, hashing files instead")
+
+    index = FileIndex(stores)
+    if repo_dir is not None:
+        index.hash_kind = HASH_GIT_BLOB
+    else:
+        index.hash_kind = HASH_SHA256 if full_hashes else HASH_CONTENT_KEY
+    trees = []
+    if shared_dir and os.path.isdir(shared_dir):
+        trees.append((SHARED, shared_dir))
+    for store in stores:
+        store_path = os.path.join(themes_dir, store)
+        if os.path.isdir(store_path):
+            trees.append((store, store_path))
+        else:
+            index.missing_stores.append(store)
+
+    if repo_dir is not None:
+        scanned, hashes, reevaluated = scan_git(trees, repo_dir)
+        scanned = [row for row in scanned if not (row[0] == SHARED and row[1] in SHARED_METADATA)]
+        if verbose:
+            print(f"Git snapshot: {reevaluated} paths re-evaluated")
+    else:
+        if manifest is None:
+            manifest = FileManifest()
+        scanned = []
+        for store, tree_dir in trees:
+            if verbose and store != SHARED:
+                print(f"Processing {store}...")
+            for rel_path, full_path, st in scan_tree(tree_dir):
+                if store == SHARED and rel_path in SHARED_METADATA:
+                    continue
+                scanned.append((store, rel_path, full_path, st.st_size))
+
+        if full_hashes:
+            hashes = manifest.get_hashes(full_path for _, _, full_path, _ in scanned)
+        else:
+            hashes, tiers = tiered_content_keys(scanned, manifest)
+            if verbose:
+                print(f"Compared by size: {tiers['size']}, by partial hash: {tiers['partial']}, "
+                      f"by full hash: {tiers['full']}")
+        manifest.save()
+        if verbose:
+            print(f"Hash cache: {manifest.reused} reused, {manifest.rehashed} rehashed")
+
+    shared_paths = {rel_path for store, rel_path, _, _ in scanned if store == SHARED}
+    for store, rel_path, full_path, size in scanned:
+        file_hash = hashes.get(full_path)
+        if file_hash:
+            index.add(store, rel_path, full_path, size, file_hash, rel_path in shared_paths)
+    return index
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Persistent content-hash manifest shared by the theme analyzers.
+
+Each entry records the size, mtime_ns, inode and SHA-256 of a file, plus the
+partial (first/last block) hash once one has been computed. On later runs a
+file whose stat signature is unchanged reuses its cached hashes, so only
+edited files are read from disk again.
+"""
+
+import os
+import json
+
+from file_hashing import hash_files, partial_hash_files
+
+MANIFEST_PATH = os.path.join('.analysis-cache', 'manifest.json')
+MANIFEST_VERSION = 1
+
+
+def manifest_key(filepath):
+    """Normalize a path so the same file always maps to one manifest entry."""
+    return os.path.abspath(filepath).replace('\\', '/')
+
+
+def stat_signature(st):
+    """Return the (size, mtime_ns, inode) tuple used to detect changed files."""
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class FileManifest:
+    """On-disk cache of file hashes keyed by absolute path."""
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self.entries = self._load()
+        self.reused = 0
+        self.rehashed = 0
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def lookup(self, filepath, st=None, field='sha256'):
+        """Return the cached hash if the file's stat signature is unchanged."""
+        entry = self.entries.get(manifest_key(filepath))
+        if entry is None:
+            return None
+        if st is None:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                return None
+        if (entry['size'], entry['mtime_ns'], entry['inode']) != stat_signature(st):
+            return None
+        return entry.get(field)
+
+    def record(self, filepath, st, file_hash, field='sha256'):
+        """Store a freshly computed hash together with its stat signature.
+
+        Other hashes of the entry are kept only if the signature still matches.
+        """
+        key = manifest_key(filepath)
+        size, mtime_ns, inode = stat_signature(st)
+        entry = self.entries.get(key)
+        if entry is None or (entry['size'], entry['mtime_ns'], entry['inode']) != (size, mtime_ns, inode):
+            entry = {
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'inode': inode,
+                'sha256': None
+            }
+            self.entries[key] = entry
+        entry[field] = file_hash
+        self._dirty = True
+
+    def move(self, old_path, new_path):
+        """Carry an entry over to a file's new path after a rename."""
+        entry = self.entries.pop(manifest_key(old_path), None)
+        if entry is not None:
+            self.entries[manifest_key(new_path)] = entry
+            self._dirty = True
+
+    def get_hash(self, filepath):
+        """Return the SHA-256 of a file, hashing it only if it changed."""
+        return self.get_hashes([filepath]).get(filepath)
+
+    def get_hashes(self, filepaths):
+        """Return {filepath: sha256} for every readable file in filepaths."""
+        return self._get_cached(filepaths, 'sha256', hash_files)
+
+    def get_partial_hashes(self, filepaths):
+        """Return {filepath: partial hash} (first and last block) for every readable file."""
+        return self._get_cached(filepaths, 'partial', partial_hash_files)
+
+    def _get_cached(self, filepaths, field, compute):
+        hashes = {}
+        stale = {}
+        for filepath in filepaths:
+            try:
+                st = os.stat(filepath)
+            except OSError as e:
+                print(f"Error hashing {filepath}: {e}")
+                continue
+
+            cached = self.lookup(filepath, st, field)
+            if cached:
+                hashes[filepath] = cached
+                self.reused += 1
+            else:
+                stale[filepath] = st
+
+        for filepath, file_hash in compute(stale).items():
+            self.record(filepath, stale[filepath], file_hash, field)
+            hashes[filepath] = file_hash
+            self.rehashed += 1
+        return hashes
+
+    def save(self):
+        """Write the manifest atomically if anything changed."""
+        if not self._dirty:
+            return
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Git-aware change detection for the analyzers.
+
+Instead of hashing files, blob SHAs are read from the git index
+(`git ls-files -s`). `git status` validates them against the working tree,
+and only modified or untracked files are hashed. A snapshot of the last run
+is kept on disk; the next run only re-evaluates the paths that `git diff`
+reports as changed since that snapshot, plus anything dirty in either run.
+"""
+
+import os
+import json
+import subprocess
+
+from file_hashing import git_blob_hash_files
+
+SNAPSHOT_PATH = os.path.join('.analysis-cache', 'git-snapshot.json')
+SNAPSHOT_VERSION = 1
+MAX_PATHSPEC_ARGS = 500  # Beyond this many changed paths, list the whole index
+GITLINK_MODE = '160000'  # Submodule entries have no file content
+
+
+def run_git(repo_dir, *args):
+    """Run a git command in repo_dir and return its raw stdout."""
+    result = subprocess.run(['git', '--literal-pathspecs', *args], cwd=repo_dir,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return result.stdout
+
+
+def find_repo_root(path):
+    """Return the top-level directory of the git checkout containing path, or None."""
+    try:
+        root = run_git(path, 'rev-parse', '--show-toplevel')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return root.decode('utf-8').strip()
+
+
+def head_commit(repo_dir):
+    """Return the SHA of HEAD, or None in a repository without commits."""
+    try:
+        return run_git(repo_dir, 'rev-parse', '--verify', '-q', 'HEAD').decode('ascii').strip()
+    except subprocess.CalledProcessError:
+        return None
+
+
+def ls_files(repo_dir, paths=None):
+    """Return {path: blob sha} for index entries, optionally limited to paths."""
+    args = ['ls-files', '-s', '-z']
+    if paths is not None:
+        if not paths:
+            return {}
+        args += ['--', *paths]
+
+    entries = {}
+    for record in run_git(repo_dir, *args).split(b'\0'):
+        if not record:
+            continue
+        info, path = record.split(b'\t', 1)
+        mode, sha, stage = info.decode('ascii').split()
+        if mode != GITLINK_MODE and stage == '0':
+            entries[path.decode('utf-8')] = sha
+    return entries
+
+
+def dirty_paths(repo_dir):
+    """Paths whose working tree content differs from the index, incl. untracked files."""
+    output = run_git(repo_dir, 'status', '--porcelain', '-z', '--untracked-files=all')
+    records = output.split(b'\0')
+    dirty = set()
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        status, path = record[:2].decode('ascii'), record[3:].decode('utf-8')
+        dirty.add(path)
+        if 'R' in status or 'C' in status:
+            # Renames and copies are followed by the original path
+            dirty.add(records[i].decode('utf-8'))
+            i += 1
+    return dirty
+
+
+def changed_between(repo_dir, old_commit, new_commit):
+    """Paths that differ between two commits, or None if old_commit is unknown."""
+    try:
+        output = run_git(repo_dir, 'diff', '--name-only', '-z', '--no-renames',
+                         old_commit, new_commit)
+    except subprocess.CalledProcessError:
+        return None
+    return {path.decode('utf-8') for path in output.split(b'\0') if path}
+
+
+class GitSnapshot:
+    """Repository-wide {path: [blob sha, size]} map kept in sync with git."""
+
+    def __init__(self, repo_dir, snapshot_path=SNAPSHOT_PATH):
+        self.repo_dir = repo_dir
+        self.snapshot_path = snapshot_path
+        self.files = {}
+        self.reevaluated = 0
+
+    def _load(self):
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SNAPSHOT_VERSION or data.get('repo') != self.repo_dir:
+            return None
+        return data
+
+    def _save(self, head, dirty):
+        snapshot_dir = os.path.dirname(self.snapshot_path)
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'repo': self.repo_dir,
+                'head': head,
+                'dirty': sorted(dirty),
+                'files': self.files
+            }, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _evaluate(self, paths, dirty):
+        """Refresh the entries for paths from the index and the working tree."""
+        clean = [path for path in paths if path not in dirty]
+        if len(clean) > MAX_PATHSPEC_ARGS:
+            wanted = set(clean)
+            blob_shas = {p: sha for p, sha in ls_files(self.repo_dir).items() if p in wanted}
+        else:
+            blob_shas = ls_files(self.repo_dir, clean)
+
+        on_disk = {}
+        for path in paths:
+            self.files.pop(path, None)
+            full_path = os.path.join(self.repo_dir, path)
+            if os.path.isfile(full_path):
+                on_disk[path] = full_path
+
+        worktree_shas = git_blob_hash_files(on_disk[p] for p in paths if p in dirty and p in on_disk)
+        for path, full_path in on_disk.items():
+            sha = blob_shas.get(path) or worktree_shas.get(full_path)
+            if sha:
+                self.files[path] = [sha, os.path.getsize(full_path)]
+        self.reevaluated += len(paths)
+
+    def refresh(self):
+        """Bring the snapshot up to date and return {path: [blob sha, size]}."""
+        head = head_commit(self.repo_dir)
+        dirty = dirty_paths(self.repo_dir)
+        previous = self._load()
+
+        changed = None
+        if previous is not None and previous.get('head') and head:
+            changed = changed_between(self.repo_dir, previous['head'], head)
+
+        if changed is None:
+            # No usable baseline: take every path from the index and the status
+            self.files = {}
+            self._evaluate(sorted(set(ls_files(self.repo_dir)) | dirty), dirty)
+        else:
+            self.files = previous['files']
+            changed |= set(previous['dirty']) | dirty
+            if changed:
+                self._evaluate(sorted(changed), dirty)
+
+        if previous is None or changed is None or changed:
+            self._save(head, dirty)
+        return self.files
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Columnar export of the per-store file index for trend analysis.
+
+Each run writes one snapshot of the (store, path, category, size, hash,
+masked) table, named after the commit it was taken at, so sharing ratios can
+be compared across the history of the themes (e.g. the 44% -> 65% goal in
+THEME_DIFFERENCES_ANALYSIS.md). Snapshots are Parquet files when pyarrow is
+installed and gzipped CSV otherwise; with NumPy installed, loaded columns
+are arrays and the ratios are computed in vectorized form.
+
+Usage: python index_export.py [--git] [--history]
+"""
+
+import os
+import sys
+import csv
+import gzip
+import subprocess
+from collections import Counter
+from datetime import datetime, timezone
+
+from file_index import SHARED, STORES, build_index
+from git_changes import dirty_paths, find_repo_root, head_commit, run_git
+
+# Optional columnar libraries: used when installed, plain Python otherwise
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HISTORY_DIR = 'index-history'
+COLUMNS = ['store', 'path', 'category', 'size', 'hash', 'masked']
+INTEGER_COLUMNS = {'size'}
+BOOLEAN_COLUMNS = {'masked'}
+CATEGORIES = {'assets', 'blocks', 'config', 'layout', 'locales', 'sections', 'snippets', 'templates'}
+
+
+def path_category(rel_path):
+    """Top-level theme directory of a path, or 'other'."""
+    category = rel_path.split('/', 1)[0]
+    return category if category in CATEGORIES else 'other'
+
+
+def index_columns(index):
+    """Return the index as {column: list}; /shared/ rows use the store name 'shared'."""
+    return {
+        'store': list(index.store_col),
+        'path': list(index.path_col),
+        'category': [path_category(rel_path) for rel_path in index.path_col],
+        'size': list(index.size_col),
+        'hash': list(index.hash_col),
+        'masked': [bool(shared) and store != SHARED
+                   for store, shared in zip(index.store_col, index.shared_col)]
+    }
+
+
+def snapshot_name(repo_dir, scanned_dirs=()):
+    """Name a snapshot after the commit time and SHA of HEAD, or the current time.
+
+    When git status reports changes under scanned_dirs (anywhere in the
+    checkout if none are given), the tree is not HEAD: '-dirty-' and the
+    current time are appended so each such state gets its own snapshot
+    (list_snapshots orders it after the clean one of the same commit).
+    """
+    now = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    commit = head_commit(repo_dir) if repo_dir else None
+    if commit is None:
+        return now + '-worktree'
+    try:
+        timestamp = int(run_git(repo_dir, 'show', '-s', '--format=%ct', commit).decode('ascii'))
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        timestamp = 0
+    committed = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    name = f"{committed}-{commit[:12]}"
+
+    prefixes = tuple(os.path.relpath(path, repo_dir).replace(os.sep, '/').rstrip('/') + '/'
+                     for path in scanned_dirs)
+    if any(not prefixes or path.startswith(prefixes) for path in dirty_paths(repo_dir)):
+        name += f"-dirty-{now}"
+    return name
+
+
+def write_snapshot(columns, name, history_dir=HISTORY_DIR):
+    """Write one snapshot and return its path."""
+    os.makedirs(history_dir, exist_ok=True)
+    if pq is not None:
+        path = os.path.join(history_dir, name + '.parquet')
+        tmp_path = path + '.tmp'
+        pq.write_table(pa.table({column: columns[column] for column in COLUMNS}), tmp_path,
+                       compression='zstd')
+    else:
+        path = os.path.join(history_dir, name + '.csv.gz')
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(zip(*(columns[column] for column in COLUMNS)))
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path):
+    """Load a snapshot as {column: array}, or {column: list} without NumPy."""
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError(f"pyarrow is required to read {path}")
+        table = pq.read_table(path, columns=COLUMNS)
+        if np is not None:
+            return {column: table.column(column).to_numpy(zero_copy_only=False) for column in COLUMNS}
+        return table.to_pydict()
+
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = {column: list(values) for column, values in zip(header, zip(*reader))}
+        for column in header:
+            columns.setdefault(column, [])
+    columns['size'] = [int(value) for value in columns['size']]
+    columns['masked'] = [value == 'True' for value in columns['masked']]
+    if np is not None:
+        return {column: np.asarray(values) for column, values in columns.items()}
+    return columns
+
+
+def snapshot_sort_key(name):
+    """(commit time and SHA, dirty, time taken) of a snapshot file name.
+
+    Plain name order would put '<commit>-dirty-<time>.csv.gz' before
+    '<commit>.csv.gz', since '-' sorts before '.'.
+    """
+    commit, _, taken = name.split('.', 1)[0].partition('-dirty-')
+    return commit, bool(taken), taken
+
+
+def list_snapshots(history_dir=HISTORY_DIR):
+    """Snapshot paths in commit order, each commit's dirty snapshots after its clean one."""
+    if not os.path.isdir(history_dir):
+        return []
+    names = [name for name in os.listdir(history_dir) if name.endswith(('.parquet', '.csv.gz'))]
+    return [os.path.join(history_dir, name) for name in sorted(names, key=snapshot_sort_key)]
+
+
+def sharing_ratios(columns, stores=STORES):
+    """{store: share of its deployed files served from /shared/}, plus 'overall'.
+
+    A store deploys every /shared/ file plus its own files that /shared/
+    doesn't mask.
+    """
+    if np is not None:
+        store_col = np.asarray(columns['store'])
+        masked_col = np.asarray(columns['masked'], dtype=bool)
+        names, counts = np.unique(store_col[~masked_col], return_counts=True)
+        file_counts = dict(zip(names.tolist(), counts.tolist()))
+    else:
+        file_counts = Counter(store for store, masked in zip(columns['store'], columns['masked'])
+                              if not masked)
+
+    shared_count = file_counts.get(SHARED, 0)
+    ratios = {}
+    present = [store for store in stores if file_counts.get(store)]
+    for store in present:
+        ratios[store] = shared_count / (shared_count + file_counts[store])
+    if present:
+        deployed = sum(shared_count + file_counts[store] for store in present)
+        ratios['overall'] = shared_count * len(present) / deployed
+    return ratios
+
+
+def print_history(history_dir=HISTORY_DIR):
+    """Print the sharing ratio of every snapshot, oldest first."""
+    snapshots = list_snapshots(history_dir)
+    print("\n" + "=" * 60)
+    print("SHARING RATIO HISTORY")
+    print("=" * 60)
+    for path in snapshots:
+        ratios = sharing_ratios(read_snapshot(path))
+        name = os.path.basename(path).split('.', 1)[0]
+        print(f"  {name}: {ratios.get('overall', 0):.1%} shared")
+    if not snapshots:
+        print(f"  No snapshots in {history_dir}/ yet")
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    index = build_index(themes_dir, shared_dir, use_git='--git' in sys.argv)
+    columns = index_columns(index)
+    path = write_snapshot(columns, snapshot_name(find_repo_root(themes_dir), [themes_dir, shared_dir]))
+
+    print(f"\nExported {len(index)} rows to {path}")
+    if pq is None:
+        print("  (pyarrow not installed: wrote gzipped CSV instead of Parquet)")
+
+    ratios = sharing_ratios(columns)
+    print("\nDeployed files served from /shared/:")
+    for store, ratio in ratios.items():
+        print(f"  {store}: {ratio:.1%}")
+
+    if '--history' in sys.argv:
+        print_history()
+
+
+if __name__ == "__main__":
+    main()
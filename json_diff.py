@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Structural JSON comparison across stores.
+
+Each JSON file (locales, schema files, config and templates) is parsed once
+and flattened to {key path: value hash}, so differences are reported per key
+instead of per file. The flattened form is cached on disk by content hash;
+files whose content hash is unchanged (taken from the manifest or git) are
+never parsed again.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+from collections import defaultdict
+
+from file_index import STORES, build_index
+
+KEY_CACHE_PATH = os.path.join('.analysis-cache', 'json-keys.json')
+KEY_CACHE_VERSION = 2
+
+# Shopify prefixes generated JSON files with a /* ... */ banner
+LEADING_COMMENT = re.compile(r'^\s*/\*.*?\*/', re.DOTALL)
+
+# List items carrying one of these keys are addressed by it instead of by
+# position, so inserting a setting doesn't shift every later key
+ITEM_ID_KEYS = ('id', 'name')
+
+
+def value_hash(value):
+    """Short stable hash of a JSON leaf value."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def escape_key(key):
+    """Escape the characters key paths use as separators, so distinct keys never collide."""
+    return (str(key).replace('\\', '\\\\').replace('.', '\\.')
+            .replace('[', '\\[').replace(']', '\\]'))
+
+
+def item_labels(items):
+    """Return a path segment for each list item: [id=...] when unique, else [index]."""
+    labels = [f'[{i}]' for i in range(len(items))]
+    for id_key in ITEM_ID_KEYS:
+        ids = [item.get(id_key) if isinstance(item, dict) else None for item in items]
+        named = [item_id for item_id in ids if isinstance(item_id, str)]
+        if named and len(named) == len(set(named)):
+            for i, item_id in enumerate(ids):
+                if isinstance(item_id, str):
+                    labels[i] = f'[{id_key}={escape_key(item_id)}]'
+            break
+    return labels
+
+
+def flatten(value, prefix=None, out=None):
+    """Return {key path: value hash} for every leaf (or empty container) in value.
+
+    Keys are escaped (see escape_key), so {"a.b": 1} and {"a": {"b": 1}}
+    flatten to different paths.
+    """
+    if out is None:
+        out = {}
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            key = escape_key(key)
+            flatten(item, key if prefix is None else f'{prefix}.{key}', out)
+    elif isinstance(value, list) and value:
+        for label, item in zip(item_labels(value), value):
+            flatten(item, (prefix or '') + label, out)
+    else:
+        out[prefix or ''] = value_hash(value)
+    return out
+
+
+def key_hashes(filepath):
+    """Parse a JSON file and return its flattened key hashes, or None."""
+    try:
+        with open(filepath, 'r', encoding='utf-8-sig') as f:
+            text = f.read()
+        return flatten(json.loads(LEADING_COMMENT.sub('', text, count=1)))
+    except (OSError, ValueError) as e:
+        print(f"Error parsing {filepath}: {e}")
+        return None
+
+
+class KeyHashCache:
+    """On-disk {content hash: {key path: value hash}} cache."""
+
+    def __init__(self, cache_path=KEY_CACHE_PATH):
+        self.cache_path = cache_path
+        self.entries = self._load()
+        self.reused = 0
+        self.parsed = 0
+        self._used = set()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != KEY_CACHE_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def get(self, content_hash, filepath):
+        """Return the key hashes for a file, parsing it only on a cache miss."""
+        self._used.add(content_hash)
+        if content_hash in self.entries:
+            self.reused += 1
+            return self.entries[content_hash]
+        keys = key_hashes(filepath)
+        if keys is not None:
+            self.entries[content_hash] = keys
+            self.parsed += 1
+            self._dirty = True
+        return keys
+
+    def save(self):
+        """Write the cache atomically, dropping versions no longer in use.
+
+        Nothing is written when no file was parsed and none was dropped.
+        """
+        if not self._dirty and self._used.issuperset(self.entries):
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.entries = {h: keys for h, keys in self.entries.items() if h in self._used}
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': KEY_CACHE_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+def compare_keys(store_keys):
+    """Return the differing keys for {store: {key path: value hash}}."""
+    stores = list(store_keys)
+    all_keys = set()
+    for keys in store_keys.values():
+        all_keys.update(keys)
+
+    differences = []
+    for key in sorted(all_keys):
+        values = {store: store_keys[store].get(key) for store in stores}
+        present = {value for value in values.values() if value is not None}
+        missing = [store for store, value in values.items() if value is None]
+        if missing or len(present) > 1:
+            differences.append({
+                'key': key,
+                'versions': len(present),
+                'missing_from': missing
+            })
+    return len(all_keys), differences
+
+
+def compare_json_files(themes_dir, shared_dir, stores=STORES, cache=None, use_git=False):
+    """Key-level differences for every non-shared JSON path whose copies differ."""
+    index = build_index(themes_dir, shared_dir, stores=stores, use_git=use_git)
+    if cache is None:
+        cache = KeyHashCache()
+
+    rows_by_path = defaultdict(list)
+    for row in index.rows(include_shared=False):
+        if index.path_col[row].endswith('.json'):
+            rows_by_path[index.path_col[row]].append(row)
+
+    results = []
+    for rel_path, rows in sorted(rows_by_path.items()):
+        if len(rows) < 2 or len({index.hash_col[row] for row in rows}) == 1:
+            continue
+        store_keys = {}
+        for row in rows:
+            keys = cache.get(index.hash_col[row], index.full_path_col[row])
+            if keys is not None:
+                store_keys[index.store_col[row]] = keys
+        if len(store_keys) < 2:
+            continue
+
+        total_keys, differences = compare_keys(store_keys)
+        results.append({
+            'file': rel_path,
+            'stores': list(store_keys),
+            'total_keys': total_keys,
+            'differing_keys': len(differences),
+            'missing_keys': sum(1 for item in differences if item['missing_from']),
+            'differences': differences
+        })
+
+    cache.save()
+    print(f"JSON key cache: {cache.reused} reused, {cache.parsed} parsed")
+    return results
+
+
+def print_differences(results, keys_per_file=5):
+    """Print a per-file summary with the first few differing keys."""
+    print("\n" + "=" * 60)
+    print("JSON KEY-LEVEL DIFFERENCES")
+    print("=" * 60)
+    for item in results:
+        print(f"\n  {item['file']}: {item['differing_keys']} of {item['total_keys']} keys differ "
+              f"({item['missing_keys']} missing in some stores)")
+        for difference in item['differences'][:keys_per_file]:
+            detail = f"{difference['versions']} versions"
+            if difference['missing_from']:
+                detail += f", missing from {', '.join(difference['missing_from'])}"
+            print(f"    {difference['key']}: {detail}")
+        if item['differing_keys'] > keys_per_file:
+            print(f"    ... and {item['differing_keys'] - keys_per_file} more")
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    results = compare_json_files(themes_dir, shared_dir, use_git='--git' in sys.argv)
+    print_differences(results)
+
+    with open('json_diff_analysis.json', 'w') as f:
+        json.dump({
+            'summary': {
+                'files_compared': len(results),
+                'differing_keys': sum(item['differing_keys'] for item in results)
+            },
+            'files': results
+        }, f, indent=2)
+
+    print(f"\nDetailed results saved to json_diff_analysis.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Render-graph index for the Liquid themes.
+
+Every .liquid and section JSON file is tokenized once into dependency
+edges: render/include (snippets), section/sections (sections and section
+groups), asset_url (assets) and the section types used by JSON templates.
+Edges are cached on disk by content hash, so a re-run only tokenizes files
+that changed. The graph is built per store over the deployed theme
+(/shared/ wins over the store's own copy), so it answers questions such as
+"what does header.liquid pull in" or "who loads enquiry.js".
+
+Usage: python liquid_graph.py [--git] [--store NAME] [--deps PATH] [--users PATH]
+"""
+
+import os
+import re
+import sys
+import json
+from collections import defaultdict
+
+from file_index import HASH_CONTENT_KEY, STORES, build_index
+from override_index import OverrideIndex
+
+GRAPH_CACHE_PATH = os.path.join('.analysis-cache', 'liquid-graph.json')
+GRAPH_CACHE_VERSION = 2
+
+# Tags at the start of a {% %} tag or of a line inside {% liquid %}
+TAG_PATTERN = re.compile(
+    r'(?:\{%-?|^)\s*(render|include|section|sections)\s+([\'"])([^\'"]+)\2'
+    r'|(?:\{%-?|^)\s*(render|include)\s+(\w+)',
+    re.MULTILINE)
+ASSET_PATTERN = re.compile(r'([\'"])([^\'"{}]+)\1\s*\|\s*asset_(?:img_)?url')
+LEADING_COMMENT = re.compile(r'^\s*/\*.*?\*/', re.DOTALL)
+
+# Tag name -> (directory, extension) of the file it pulls in
+TAG_TARGETS = {
+    'render': ('snippets', '.liquid'),
+    'include': ('snippets', '.liquid'),
+    'section': ('sections', '.liquid'),
+    'sections': ('sections', '.json')
+}
+DYNAMIC = 'dynamic'  # render with a variable name, e.g. {% render block %}
+
+
+def liquid_edges(text):
+    """Return [(kind, target path)] for the tags and asset references in Liquid source."""
+    edges = []
+    for match in TAG_PATTERN.finditer(text):
+        if match.group(1):
+            directory, extension = TAG_TARGETS[match.group(1)]
+            edges.append((match.group(1), f'{directory}/{match.group(3)}{extension}'))
+        elif match.group(5) not in ('with', 'for'):
+            edges.append((DYNAMIC, match.group(5)))
+    for match in ASSET_PATTERN.finditer(text):
+        edges.append(('asset_url', f'assets/{match.group(2)}'))
+    return edges
+
+
+def json_edges(text):
+    """Return [(kind, target path)] for the section types used by a JSON template or group."""
+    try:
+        data = json.loads(LEADING_COMMENT.sub('', text, count=1))
+    except ValueError:
+        return []
+    sections = data.get('sections') if isinstance(data, dict) else None
+    if not isinstance(sections, dict):
+        return []
+    edges = []
+    for section in sections.values():
+        if isinstance(section, dict) and isinstance(section.get('type'), str):
+            edges.append(('section', f"sections/{section['type']}.liquid"))
+    return edges
+
+
+def file_edges(filepath, rel_path):
+    """Tokenize one theme file, or return None if it cannot be read."""
+    try:
+        with open(filepath, 'r', encoding='utf-8-sig', errors='replace') as f:
+            text = f.read()
+    except OSError as e:
+        print(f"Error reading {filepath}: {e}")
+        return None
+    if rel_path.endswith('.json'):
+        return json_edges(text)
+    return liquid_edges(text)
+
+
+def parser_kind(rel_path):
+    """Which tokenizer file_edges uses for a path."""
+    return 'json' if rel_path.endswith('.json') else 'liquid'
+
+
+def is_graph_source(rel_path):
+    """Files that can pull in other files."""
+    if rel_path.endswith('.liquid'):
+        return True
+    return rel_path.endswith('.json') and rel_path.startswith(('templates/', 'sections/'))
+
+
+class EdgeCache:
+    """On-disk {"parser:content hash": [[kind, target], ...]} cache.
+
+    The parser is part of the key: identical bytes in a .json and a .liquid
+    file are tokenized differently.
+    """
+
+    def __init__(self, cache_path=GRAPH_CACHE_PATH):
+        self.cache_path = cache_path
+        self.entries = self._load()
+        self.reused = 0
+        self.parsed = 0
+        self._used = set()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != GRAPH_CACHE_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def get(self, content_hash, filepath, rel_path):
+        """Return the edges of a file, tokenizing it only on a cache miss."""
+        key = f'{parser_kind(rel_path)}:{content_hash}'
+        self._used.add(key)
+        if key in self.entries:
+            self.reused += 1
+            return self.entries[key]
+        edges = file_edges(filepath, rel_path)
+        if edges is not None:
+            self.entries[key] = [list(edge) for edge in edges]
+            self.parsed += 1
+            self._dirty = True
+        return edges
+
+    def save(self):
+        """Write the cache atomically, dropping files no longer in any store.
+
+        Nothing is written when no file was tokenized and none was dropped.
+        """
+        if not self._dirty and self._used.issuperset(self.entries):
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.entries = {h: edges for h, edges in self.entries.items() if h in self._used}
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': GRAPH_CACHE_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+class LiquidGraph:
+    """Per-store dependency graph of the deployed theme files."""
+
+    def __init__(self, stores):
+        self.stores = list(stores)
+        self.files = {store: set() for store in self.stores}
+        self.edges = {store: defaultdict(list) for store in self.stores}    # path -> [(kind, target)]
+        self.reverse = {store: defaultdict(list) for store in self.stores}  # target -> [(kind, path)]
+
+    def add_file(self, store, rel_path, edges):
+        self.files[store].add(rel_path)
+        for kind, target in edges:
+            self.edges[store][rel_path].append((kind, target))
+            if kind != DYNAMIC:
+                self.reverse[store][target].append((kind, rel_path))
+
+    def dependencies(self, store, rel_path, recursive=True):
+        """Files rel_path pulls in, directly or (by default) transitively."""
+        seen = set()
+        pending = [rel_path]
+        while pending:
+            current = pending.pop()
+            for kind, target in self.edges[store].get(current, []):
+                if kind != DYNAMIC and target not in seen:
+                    seen.add(target)
+                    if recursive:
+                        pending.append(target)
+        return sorted(seen)
+
+    def dependents(self, store, target, recursive=False):
+        """Files that reference target, directly or (optionally) transitively."""
+        seen = set()
+        pending = [target]
+        while pending:
+            current = pending.pop()
+            for _, source in self.reverse[store].get(current, []):
+                if source not in seen:
+                    seen.add(source)
+                    if recursive:
+                        pending.append(source)
+        return sorted(seen)
+
+    def unreferenced(self, store, directory='snippets'):
+        """Files under directory that nothing renders, includes or loads."""
+        prefix = directory.rstrip('/') + '/'
+        return sorted(path for path in self.files[store]
+                      if path.startswith(prefix) and path not in self.reverse[store])
+
+    def missing_targets(self, store):
+        """Referenced files that don't exist in the deployed theme."""
+        return sorted(target for target in self.reverse[store] if target not in self.files[store])
+
+    def dynamic_renders(self, store):
+        """Files with {% render variable %}, which the graph can't resolve."""
+        return sorted(path for path, edges in self.edges[store].items()
+                      if any(kind == DYNAMIC for kind, _ in edges))
+
+
+def build_liquid_graph(themes_dir, shared_dir, stores=STORES, cache=None, verbose=True,
+                       use_git=False, index=None):
+    """Index every store's deployed theme and return a LiquidGraph.
+
+    An existing FileIndex (with /shared/ and full hashes) can be passed in
+    to avoid scanning the trees again.
+    """
+    if index is None:
+        index = build_index(themes_dir, shared_dir, stores=stores, verbose=verbose, use_git=use_git)
+    elif index.hash_kind == HASH_CONTENT_KEY:
+        # Tiered keys such as size:1234 collide across paths
+        raise ValueError("build_liquid_graph needs an index built with full hashes")
+    overrides = OverrideIndex(index)
+    if cache is None:
+        cache = EdgeCache()
+
+    graph = LiquidGraph(stores)
+    for store in stores:
+        for rel_path, (_, row) in overrides.effective[store].items():
+            edges = []
+            if is_graph_source(rel_path):
+                edges = cache.get(index.hash_col[row], index.full_path_col[row], rel_path) or []
+            graph.add_file(store, rel_path, edges)
+
+    cache.save()
+    if verbose:
+        print(f"Liquid graph: {cache.reused} files reused, {cache.parsed} tokenized")
+    return graph
+
+
+def arg_value(flag):
+    """Return the value following flag on the command line, or None."""
+    if flag in sys.argv:
+        position = sys.argv.index(flag) + 1
+        if position < len(sys.argv):
+            return sys.argv[position]
+    return None
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    graph = build_liquid_graph(themes_dir, shared_dir, use_git='--git' in sys.argv)
+    stores = [arg_value('--store')] if arg_value('--store') else graph.stores
+
+    deps_path = arg_value('--deps')
+    users_path = arg_value('--users')
+    if deps_path or users_path:
+        for store in stores:
+            if deps_path:
+                print(f"\n{store}: {deps_path} pulls in")
+                for target in graph.dependencies(store, deps_path):
+                    print(f"  {target}")
+            if users_path:
+                print(f"\n{store}: {users_path} is used by")
+                for source in graph.dependents(store, users_path):
+                    print(f"  {source}")
+        return
+
+    print("\n" + "=" * 60)
+    print("LIQUID RENDER GRAPH")
+    print("=" * 60)
+    results = {}
+    for store in stores:
+        unused_snippets = graph.unreferenced(store, 'snippets')
+        missing = graph.missing_targets(store)
+        results[store] = {
+            'files': len(graph.files[store]),
+            'edges': sum(len(edges) for edges in graph.edges[store].values()),
+            'unreferenced_snippets': unused_snippets,
+            'missing_targets': missing,
+            'dynamic_renders': graph.dynamic_renders(store)
+        }
+        print(f"\n{store}: {results[store]['files']} files, {results[store]['edges']} references")
+        print(f"  Snippets never rendered: {len(unused_snippets)}")
+        for rel_path in unused_snippets[:10]:
+            print(f"    {rel_path}")
+        if len(unused_snippets) > 10:
+            print(f"    ... and {len(unused_snippets) - 10} more")
+        print(f"  References to missing files: {len(missing)}")
+
+    with open('liquid_graph_analysis.json', 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nDetailed results saved to liquid_graph_analysis.json")
+
+
+if __name__ == "__main__":
+    main()
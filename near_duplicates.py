@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for files that differ slightly between stores.
+
+Every copy of a non-shared path gets a bottom-k MinHash sketch: the k
+smallest hashes of its shingles (pairs of consecutive statements). Two
+sketches estimate the Jaccard similarity of the copies without diffing
+them, and the estimate is exact for files with fewer than k shingles.
+
+Paths are ranked as candidates for /shared/ by how much content would have
+to be reconciled: the copy most similar to the others is picked as the
+base, and the estimated bytes that differ from it are summed over the
+other stores.
+"""
+
+import re
+import sys
+import json
+import heapq
+import zlib
+from itertools import combinations
+
+from file_index import STORES, build_index
+
+SKETCH_SIZE = 256          # Hashes kept per file (k)
+SHINGLE_UNITS = 2          # Consecutive statements per shingle
+MIN_SIMILARITY = 0.5       # Below this, copies are not worth consolidating
+TEXT_EXTENSIONS = ('.liquid', '.json', '.js', '.css', '.svg')
+
+# Lines, plus statement and block boundaries so minified files still split up
+UNIT_SPLIT = re.compile(rb'[\r\n;{}]+')
+
+
+def sketch_file(filepath, k=SKETCH_SIZE):
+    """Return the bottom-k MinHash sketch of a file as a sorted list, or None."""
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Error reading {filepath}: {e}")
+        return None
+
+    units = [unit.strip() for unit in UNIT_SPLIT.split(data)]
+    units = [unit for unit in units if unit]
+    if len(units) < SHINGLE_UNITS:
+        shingles = {zlib.crc32(b'\n'.join(units))}
+    else:
+        shingles = {zlib.crc32(b'\n'.join(units[i:i + SHINGLE_UNITS]))
+                    for i in range(len(units) - SHINGLE_UNITS + 1)}
+    return heapq.nsmallest(k, shingles)
+
+
+def estimate_similarity(sketch_a, sketch_b, k=SKETCH_SIZE):
+    """Estimate the Jaccard similarity of two files from their sketches."""
+    set_a = set(sketch_a)
+    set_b = set(sketch_b)
+    union = heapq.nsmallest(k, set_a | set_b)
+    if not union:
+        return 1.0
+    shared = sum(1 for h in union if h in set_a and h in set_b)
+    return shared / len(union)
+
+
+def score_path(rel_path, copies):
+    """Score one path given {store: (size, sketch)} for its differing copies."""
+    stores = sorted(copies)
+    pairs = {}
+    for store_a, store_b in combinations(stores, 2):
+        pairs[(store_a, store_b)] = estimate_similarity(copies[store_a][1], copies[store_b][1])
+
+    def similarity(store_a, store_b):
+        if store_a == store_b:
+            return 1.0
+        return pairs.get((store_a, store_b), pairs.get((store_b, store_a)))
+
+    # The base is the copy closest to all the others
+    base = max(stores, key=lambda store: sum(similarity(store, other) for other in stores))
+    divergent_bytes = sum(int((1 - similarity(base, store)) * copies[store][0])
+                          for store in stores if store != base)
+    return {
+        'file': rel_path,
+        'stores': stores,
+        'base_store': base,
+        'min_similarity': round(min(pairs.values()), 3),
+        'mean_similarity': round(sum(pairs.values()) / len(pairs), 3),
+        'estimated_divergent_bytes': divergent_bytes,
+        'total_bytes': sum(size for size, _ in copies.values()),
+        'similarity_to_base': {store: round(similarity(base, store), 3) for store in stores}
+    }
+
+
+def find_near_duplicates(themes_dir, shared_dir, stores=STORES, use_git=False):
+    """Score every non-shared path that exists in several stores with different content."""
+    index = build_index(themes_dir, shared_dir, stores=stores, full_hashes=False, use_git=use_git)
+
+    rows_by_path = {}
+    for row in index.rows(include_shared=False):
+        rows_by_path.setdefault(index.path_col[row], []).append(row)
+
+    # Identical copies need no sketch; one sketch per distinct content is enough
+    sketches = {}
+    results = []
+    for rel_path, rows in sorted(rows_by_path.items()):
+        if not rel_path.endswith(TEXT_EXTENSIONS) or len(rows) < 2:
+            continue
+        if len({index.hash_col[row] for row in rows}) == 1:
+            continue
+
+        copies = {}
+        for row in rows:
+            content_key = (rel_path, index.hash_col[row])
+            if content_key not in sketches:
+                sketches[content_key] = sketch_file(index.full_path_col[row])
+            if sketches[content_key] is not None:
+                copies[index.store_col[row]] = (index.size_col[row], sketches[content_key])
+        if len(copies) >= 2:
+            results.append(score_path(rel_path, copies))
+
+    print(f"Sketched {len(sketches)} distinct file versions across {len(results)} paths")
+    return results
+
+
+def rank_candidates(results, min_similarity=MIN_SIMILARITY):
+    """Paths worth moving to /shared/, cheapest to reconcile first."""
+    candidates = [item for item in results if item['min_similarity'] >= min_similarity]
+    return sorted(candidates, key=lambda item: (item['estimated_divergent_bytes'],
+                                                -item['mean_similarity'], item['file']))
+
+
+def print_candidates(candidates, limit=25):
+    """Print the ranked consolidation candidates."""
+    print("\n" + "=" * 60)
+    print("NEAR-DUPLICATE FILES (cheapest /shared/ candidates first)")
+    print("=" * 60)
+    for item in candidates[:limit]:
+        print(f"\n  {item['file']}")
+        print(f"    Similarity: min {item['min_similarity']:.0%}, mean {item['mean_similarity']:.0%} "
+              f"across {len(item['stores'])} stores")
+        print(f"    Base: {item['base_store']}, ~{item['estimated_divergent_bytes']:,} bytes "
+              f"to reconcile of {item['total_bytes']:,}")
+    if len(candidates) > limit:
+        print(f"\n  ... and {len(candidates) - limit} more")
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    results = find_near_duplicates(themes_dir, shared_dir, use_git='--git' in sys.argv)
+    candidates = rank_candidates(results)
+    print_candidates(candidates)
+
+    with open('near_duplicates_analysis.json', 'w') as f:
+        json.dump({
+            'summary': {
+                'paths_compared': len(results),
+                'consolidation_candidates': len(candidates),
+                'min_similarity': MIN_SIMILARITY
+            },
+            'candidates': candidates,
+            'all_paths': sorted(results, key=lambda item: item['file'])
+        }, f, indent=2)
+
+    print(f"\nDetailed results saved to near_duplicates_analysis.json")
+
+
+if __name__ == "__main__":
+    main()
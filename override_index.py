@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Shared-override resolution for every store.
+
+The deploy step copies /shared/ over each store theme, so a store file with
+the same relative path as a shared file never reaches the live branch. This
+module resolves, per store, which source every path is deployed from and
+flags masked store files whose content differs from the shared version
+(edits that are silently lost on deploy).
+
+The index is built on file_index, so a re-run only re-reads files whose
+stat signature (or git blob) changed since the last run.
+"""
+
+import sys
+import json
+from collections import defaultdict
+
+from file_index import SHARED, STORES, build_index
+
+SOURCE_SHARED = 'shared'
+SOURCE_STORE = 'store'
+
+
+class OverrideIndex:
+    """{store: {path: effective source}} plus the store files /shared/ masks."""
+
+    def __init__(self, index):
+        self.index = index
+        self.stores = list(index.stores)
+        self.effective = {store: {} for store in self.stores}  # store -> {path: (source, row)}
+        self.masked = {store: {} for store in self.stores}     # store -> {path: content differs}
+
+        shared_rows = {index.path_col[row]: row for row in index.rows(SHARED)}
+        for store in self.stores:
+            effective = self.effective[store]
+            for rel_path, row in shared_rows.items():
+                effective[rel_path] = (SOURCE_SHARED, row)
+            for row in index.rows(store):
+                rel_path = index.path_col[row]
+                shared_row = shared_rows.get(rel_path)
+                if shared_row is None:
+                    effective[rel_path] = (SOURCE_STORE, row)
+                else:
+                    # Content keys are comparable between copies of one path
+                    self.masked[store][rel_path] = index.hash_col[row] != index.hash_col[shared_row]
+
+    def source(self, store, rel_path):
+        """Return 'shared', 'store' or None for a path as deployed to store."""
+        entry = self.effective[store].get(rel_path)
+        return entry[0] if entry else None
+
+    def masked_files(self, store):
+        """Store files that are replaced by /shared/ on deploy."""
+        return sorted(self.masked[store])
+
+    def conflicts(self):
+        """Masked store files whose content differs from the shared version."""
+        shared_sizes = {self.index.path_col[row]: self.index.size_col[row]
+                        for row in self.index.rows(SHARED)}
+        conflicts = []
+        for store in self.stores:
+            for rel_path, differs in sorted(self.masked[store].items()):
+                if differs:
+                    row = self.index.get(store, rel_path)
+                    conflicts.append({
+                        'file': rel_path,
+                        'store': store,
+                        'store_size': self.index.size_col[row],
+                        'shared_size': shared_sizes[rel_path]
+                    })
+        return conflicts
+
+    def summary(self):
+        """Per-store counts of deployed, masked and conflicting files."""
+        summary = {}
+        for store in self.stores:
+            sources = [source for source, _ in self.effective[store].values()]
+            summary[store] = {
+                'deployed_files': len(sources),
+                'from_shared': sources.count(SOURCE_SHARED),
+                'from_store': sources.count(SOURCE_STORE),
+                'masked_by_shared': len(self.masked[store]),
+                'masked_with_different_content': sum(self.masked[store].values())
+            }
+        return summary
+
+
+def build_override_index(themes_dir, shared_dir, stores=STORES, verbose=True, use_git=False):
+    """Scan /shared/ and every store once and resolve the overrides."""
+    index = build_index(themes_dir, shared_dir, stores=stores, verbose=verbose,
+                        full_hashes=False, use_git=use_git)
+    return OverrideIndex(index)
+
+
+def print_conflict_report(overrides):
+    """Print per-store override counts and every conflicting masked file."""
+    print("\n" + "=" * 60)
+    print("SHARED OVERRIDE REPORT")
+    print("=" * 60)
+
+    for store, counts in overrides.summary().items():
+        print(f"\n{store}:")
+        print(f"  Deployed files: {counts['deployed_files']} "
+              f"({counts['from_shared']} from /shared/, {counts['from_store']} from the store)")
+        print(f"  Store files masked by /shared/: {counts['masked_by_shared']} "
+              f"({counts['masked_with_different_content']} with different content)")
+
+    conflicts = overrides.conflicts()
+    print(f"\nMASKED FILES WITH DIFFERENT CONTENT ({len(conflicts)})")
+    print("-" * 60)
+    by_file = defaultdict(list)
+    for conflict in conflicts:
+        by_file[conflict['file']].append(conflict)
+    for rel_path, items in sorted(by_file.items()):
+        print(f"  {rel_path} (shared: {items[0]['shared_size']:,} bytes)")
+        for item in items:
+            print(f"    {item['store']}: {item['store_size']:,} bytes, ignored on deploy")
+
+
+def main():
+    themes_dir = r"C:\Users\User\projects\shopify\multisite\themes"
+    shared_dir = r"C:\Users\User\projects\shopify\multisite\shared"
+
+    # --git reads blob SHAs from git instead of hashing
+    overrides = build_override_index(themes_dir, shared_dir, use_git='--git' in sys.argv)
+    print_conflict_report(overrides)
+
+    results = {
+        'summary': overrides.summary(),
+        'conflicts': overrides.conflicts()
+    }
+    with open('shared_override_analysis.json', 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nDetailed results saved to shared_override_analysis.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Streaming report writers for the analysis outputs.
+
+Reports are written piece by piece as results are produced instead of being
+built in memory and dumped at the end, so a full, untruncated report needs
+no second in-memory copy of its lists on top of the file index they are
+computed from. The index itself is built before anything is written.
+
+JsonReportWriter produces the same indented JSON as json.dump(indent=2);
+NdjsonReportWriter writes one record per line for tools that tail or grep
+the output. open_report() picks one from the file extension.
+
+Records go to path + '.tmp' as they are written (tail that file to follow a
+run), which replaces the report only when the writer is closed normally.
+A run that fails keeps the previous report and deletes its partial output.
+
+    with open_report('report.json') as report:
+        report.begin_list('files')
+        for item in items:
+            report.add(item)
+        report.end()
+        report.write('summary', {'files': len(items)})
+"""
+
+import os
+import json
+
+INDENT = '  '
+TMP_SUFFIX = '.tmp'
+
+
+class _ReportFile:
+    """Temp-file handling shared by the writers."""
+
+    def _open(self, path):
+        self.path = path
+        self.tmp_path = path + TMP_SUFFIX
+        self.f = open(self.tmp_path, 'w')
+
+    def _finish(self):
+        """Close the temp file and publish it as the report."""
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Drop the partial report, leaving any previous one in place."""
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't close the open containers: a truncated report must not
+            # look complete
+            self.abort()
+
+
+class JsonReportWriter(_ReportFile):
+    """Incremental encoder for one top-level JSON object."""
+
+    def __init__(self, path):
+        self._open(path)
+        self.f.write('{')
+        self._stack = [['object', 0]]  # [kind, entries written so far]
+
+    def _open_entry(self, key):
+        """Start a new entry in the innermost container, returning its indent."""
+        kind, count = self._stack[-1]
+        if (kind == 'object') != (key is not None):
+            raise ValueError(f"A key is {'required' if kind == 'object' else 'not allowed'} inside a JSON {kind}")
+        indent = INDENT * len(self._stack)
+        self.f.write(',\n' if count else '\n')
+        self.f.write(indent)
+        if key is not None:
+            self.f.write(json.dumps(str(key)) + ': ')
+        self._stack[-1][1] += 1
+        return indent
+
+    def _write_value(self, key, value):
+        indent = self._open_entry(key)
+        self.f.write(json.dumps(value, indent=2).replace('\n', '\n' + indent))
+        self.f.flush()
+
+    def write(self, key, value):
+        """Write a complete member of the current object."""
+        self._write_value(key, value)
+
+    def add(self, item):
+        """Append one item to the current list."""
+        self._write_value(None, item)
+
+    def begin_list(self, key=None):
+        """Open a list; key is required inside an object."""
+        self._open_entry(key)
+        self.f.write('[')
+        self._stack.append(['list', 0])
+
+    def begin_object(self, key=None):
+        """Open a nested object; key is required inside an object."""
+        self._open_entry(key)
+        self.f.write('{')
+        self._stack.append(['object', 0])
+
+    def end(self):
+        """Close the innermost open list or object."""
+        kind, count = self._stack.pop()
+        if count:
+            self.f.write('\n' + INDENT * len(self._stack))
+        self.f.write(']' if kind == 'list' else '}')
+        self.f.flush()
+
+    def close(self):
+        """Close any open containers and publish the report."""
+        while len(self._stack) > 1:
+            self.end()
+        self.end()
+        self._finish()
+
+
+class NdjsonReportWriter(_ReportFile):
+    """Same interface as JsonReportWriter, one JSON record per line.
+
+    Every record names the section it belongs to as a '/'-joined key path:
+    list items are written as {"section": ..., "item": ...} and plain
+    members as {"section": ..., "value": ...}.
+    """
+
+    def __init__(self, path):
+        self._open(path)
+        self._keys = []
+
+    def _section(self, key=None):
+        return '/'.join(self._keys + ([str(key)] if key is not None else []))
+
+    def _record(self, record):
+        self.f.write(json.dumps(record) + '\n')
+        self.f.flush()
+
+    def write(self, key, value):
+        self._record({'section': self._section(key), 'value': value})
+
+    def add(self, item):
+        self._record({'section': self._section(), 'item': item})
+
+    def begin_list(self, key=None):
+        self._keys.append(str(key))
+
+    def begin_object(self, key=None):
+        self._keys.append(str(key))
+
+    def end(self):
+        self._keys.pop()
+
+    def close(self):
+        """Publish the report."""
+        self._finish()
+
+
+def open_report(path):
+    """Return a report writer for path: NDJSON for .ndjson/.jsonl, JSON otherwise."""
+    if path.endswith(('.ndjson', '.jsonl')):
+        return NdjsonReportWriter(path)
+    return JsonReportWriter(path)
+
+
+def report_path(path, ndjson=False):
+    """Swap a .json report path for .ndjson when NDJSON output is requested."""
+    if ndjson and path.endswith('.json'):
+        return path[:-len('.json')] + '.ndjson'
+    return path
@@ -0,0 +1,142 @@
+const fs = require('fs-extra');
+const path = require('path');
+const crypto = require('crypto');
+const { transformManifest } = require('./minify');
+
+const BUNDLE_SUFFIX = '.bundle.css';
+// The plain render-blocking tag; lazy <link media="print"> loads and
+// preloads are left alone
+const PLAIN_TAG = /\{\{-?\s*['"](component-[\w-]+\.css)['"]\s*\|\s*asset_url\s*\|\s*stylesheet_tag\s*-?\}\}/g;
+const LIQUID_TAG = /\{%-?\s*(\w+)[\s\S]*?-?%\}/g;
+const HTML_COMMENT = /<!--[\s\S]*?(?:-->|$)/g;
+const HEAD = /<head\b[^>]*>([\s\S]*?)<\/head>/i;
+
+// [start, end) spans that may not render: the inside of Liquid blocks
+// ({% if %}, {% unless %}, {% for %}, {% comment %}, ...) and HTML comments
+function conditionalSpans(text) {
+  const tags = [...text.matchAll(LIQUID_TAG)];
+  const blocks = new Set(tags.filter((tag) => tag[1].startsWith('end')).map((tag) => tag[1].slice(3)));
+  const spans = [];
+  let depth = 0;
+  let start = 0;
+  for (const tag of tags) {
+    const name = tag[1];
+    if (blocks.has(name)) {
+      if (depth++ === 0) start = tag.index;
+    } else if (name.startsWith('end') && blocks.has(name.slice(3)) && depth > 0) {
+      if (--depth === 0) spans.push([start, tag.index + tag[0].length]);
+    }
+  }
+  if (depth > 0) spans.push([start, text.length]);
+  for (const comment of text.matchAll(HTML_COMMENT)) {
+    spans.push([comment.index, comment.index + comment[0].length]);
+  }
+  return spans;
+}
+
+// Runs of two or more plain component tags in a layout's <head> that always
+// render and follow each other with nothing but whitespace in between, as
+// [{ start, end, names }] in document order. Replacing a run with one tag
+// for the concatenated stylesheets keeps the cascade exactly as it was.
+function headRuns(text, isComponent) {
+  const head = HEAD.exec(text);
+  if (!head) return [];
+  const headStart = head.index + head[0].indexOf('>') + 1;
+  const headEnd = headStart + head[1].length;
+  const spans = conditionalSpans(text);
+
+  const runs = [];
+  let run = null;
+  for (const tag of text.matchAll(PLAIN_TAG)) {
+    const start = tag.index;
+    const end = start + tag[0].length;
+    if (start < headStart || end > headEnd || !isComponent(tag[1]) ||
+        spans.some(([from, to]) => start >= from && start < to)) {
+      run = null;
+      continue;
+    }
+    if (run && text.slice(run.end, start).trim() === '') {
+      run.end = end;
+      run.names.push(tag[1]);
+    } else {
+      run = { start, end, names: [tag[1]] };
+      runs.push(run);
+    }
+  }
+  return runs.filter((candidate) => candidate.names.length > 1);
+}
+
+// Concatenate each run of unconditional component stylesheet tags in a
+// layout's <head> into one bundle (assets/<layout>-<n>.bundle.css, in
+// document order) and link the bundle in place of the run. Tags inside
+// Liquid conditionals or comments, tags in sections and snippets, and runs
+// interrupted by anything else are left as they are, so every page loads
+// the same rules in the same order as before. Bundles are cached by the
+// blob SHAs of their inputs, and rewritten layouts by their own SHA and the
+// bundle keys, so repeat deploys reuse both.
+async function bundleComponentCss(manifest, hashes, cacheDir, log = console.log) {
+  const isComponent = (name) => manifest.has(`assets/${name}`);
+  const layouts = [...manifest.keys()].filter((relPath) => relPath.startsWith('layout/') && relPath.endsWith('.liquid'));
+  await fs.ensureDir(cacheDir);
+
+  const plans = new Map();  // layout -> { tool, bundles: [[bundle name, run length]] }
+  let bundled = 0;
+  for (const relPath of layouts) {
+    const runs = headRuns(await fs.readFile(manifest.get(relPath), 'utf8'), isComponent);
+    if (runs.length === 0) continue;
+
+    const layoutName = path.basename(relPath, '.liquid');
+    const keys = [];
+    const bundles = [];
+    for (const [i, run] of runs.entries()) {
+      const bundleName = `${layoutName}-${i + 1}${BUNDLE_SUFFIX}`;
+      const digest = crypto.createHash('sha1');
+      for (const name of run.names) digest.update(`${name} ${hashes.get(`assets/${name}`)}\n`);
+      const bundleKey = digest.digest('hex');
+
+      const bundlePath = path.join(cacheDir, `${bundleKey}-${BUNDLE_SUFFIX.slice(1)}`);
+      if (!await fs.pathExists(bundlePath)) {
+        const parts = [];
+        for (const name of run.names) {
+          parts.push(`/* ${name} */\n${await fs.readFile(manifest.get(`assets/${name}`), 'utf8')}\n`);
+        }
+        const tmpPath = `${bundlePath}.${process.pid}.${Math.random().toString(36).slice(2)}.tmp`;
+        await fs.writeFile(tmpPath, parts.join(''));
+        await fs.rename(tmpPath, bundlePath);
+      }
+      manifest.set(`assets/${bundleName}`, bundlePath);
+      // Stands in for the blob SHA as the cache key of later stages (e.g. --minify)
+      hashes.set(`assets/${bundleName}`, bundleKey);
+      keys.push(bundleKey);
+      bundles.push(bundleName);
+      bundled += run.names.length;
+    }
+    const tool = `bundle-css@2-${crypto.createHash('sha1').update(keys.join(' ')).digest('hex').slice(0, 12)}`;
+    plans.set(relPath, { tool, bundles });
+  }
+  if (plans.size === 0) return { bundled: 0, rewritten: 0 };
+
+  const result = await transformManifest(manifest, hashes, cacheDir, (relPath) => {
+    const plan = plans.get(relPath);
+    if (!plan) return null;
+    return {
+      tool: plan.tool,
+      allowLarger: true,
+      transform: (input) => {
+        const text = input.toString('utf8');
+        const runs = headRuns(text, isComponent);
+        let output = '';
+        let position = 0;
+        for (const [i, run] of runs.entries()) {
+          output += text.slice(position, run.start) + `{{ '${plan.bundles[i]}' | asset_url | stylesheet_tag }}`;
+          position = run.end;
+        }
+        return output + text.slice(position);
+      }
+    };
+  }, log);
+
+  return { bundled, rewritten: result.processed + result.reused };
+}
+
+module.exports = { bundleComponentCss, headRuns };
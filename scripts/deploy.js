@@ -1,9 +1,11 @@
 #!/usr/bin/env node
 const fs = require('fs-extra');
 const path = require('path');
-const { exec } = require('child_process');
-const util = require('util');
-const execPromise = util.promisify(exec);
+const { constants } = require('fs');
+const { spawn } = require('child_process');
+const { minifyManifest } = require('./minify');
+const { optimizeImages } = require('./optimize-images');
+const { bundleComponentCss } = require('./bundle-css');
 
 // Store to branch mappings
 const STORE_BRANCHES = {
@@ -15,17 +17,293 @@ const STORE_BRANCHES = {
   'roofing4us': 'roofing4us-live'
 };
 
-async function deployStore(storeName) {
+// Old value for update-ref when the branch must not exist yet
+const ZERO_OID = '0000000000000000000000000000000000000000';
+
+// Staged copies of the merged themes (--stage); file contents live once in
+// .objects, keyed by blob SHA, and each store directory links to them
+const STAGE_DIR = path.join('..', 'temp-deploy');
+const OBJECTS_DIR = path.join(STAGE_DIR, '.objects');
+
+// Errors that mean the filesystem can't hardlink between these paths
+const NO_LINK_ERRORS = new Set(['EXDEV', 'EPERM', 'ENOTSUP', 'EMLINK', 'ENOSYS']);
+
+// Reachability pruning (--prune): files that can reference snippets and assets
+const TEXT_EXTENSIONS = new Set(['.liquid', '.json', '.css', '.js']);
+const SNIPPET_TAG = /(?:\{%-?|^)\s*(?:render|include)\s+['"]([^'"]+)['"]/gm;
+const DYNAMIC_PREFIX = /prepend:\s*['"]([^'"]+)['"]/g;
+// Setting values a dynamic asset name can be built from
+const DATA_FILES = /^(templates|sections)\/[^/]+\.json$|^config\/settings_data\.json$/;
+const DATA_VALUE = /"([A-Za-z0-9_-]+)"/g;
+const SCHEMA_DEFAULT = /"default"\s*:\s*"([A-Za-z0-9_-]+)"/g;
+
+// Run git with arguments (no shell) and optional stdin, resolving to stdout
+function runGit(args, { input, env } = {}) {
+  return new Promise((resolve, reject) => {
+    const child = spawn('git', args, { env: env || process.env });
+    const stdout = [];
+    const stderr = [];
+    child.stdout.on('data', (chunk) => stdout.push(chunk));
+    child.stderr.on('data', (chunk) => stderr.push(chunk));
+    child.on('error', reject);
+    // Commands that don't read stdin may exit before it is flushed;
+    // failures are reported through the exit code instead
+    child.stdin.on('error', () => {});
+    child.on('close', (code) => {
+      if (code === 0) {
+        resolve(Buffer.concat(stdout).toString('utf8'));
+      } else {
+        reject(new Error(`git ${args[0]} failed: ${Buffer.concat(stderr).toString('utf8').trim()}`));
+      }
+    });
+    child.stdin.end(input);
+  });
+}
+
+// List files under dir as forward-slash paths relative to dir
+async function listFiles(dir, prefix = '') {
+  const files = [];
+  const entries = await fs.readdir(dir, { withFileTypes: true });
+  for (const entry of entries) {
+    const relPath = prefix + entry.name;
+    if (entry.isDirectory()) {
+      files.push(...await listFiles(path.join(dir, entry.name), relPath + '/'));
+    } else if (entry.isFile()) {
+      files.push(relPath);
+    }
+  }
+  return files;
+}
+
+// Merged theme + shared file list: { relPath -> source path }, shared wins
+async function buildManifest(storeName) {
+  const manifest = new Map();
+  const themeDir = path.join('themes', storeName);
+  for (const relPath of await listFiles(themeDir)) {
+    manifest.set(relPath, path.join(themeDir, relPath));
+  }
+  if (await fs.pathExists('shared')) {
+    for (const relPath of await listFiles('shared')) {
+      manifest.set(relPath, path.join('shared', relPath));
+    }
+  }
+  return manifest;
+}
+
+// Blob SHAs of the committed live branch: { relPath -> sha }
+async function readBranchTree(branch) {
+  const tree = new Map();
+  const output = await runGit(['ls-tree', '-r', '-z', '--full-tree', branch]);
+  for (const record of output.split('\0')) {
+    if (!record) continue;
+    const tab = record.indexOf('\t');
+    const [, type, sha] = record.slice(0, tab).split(' ');
+    if (type === 'blob') {
+      tree.set(record.slice(tab + 1), sha);
+    }
+  }
+  return tree;
+}
+
+// Source path -> blob SHA, so shared files are hashed once per run
+const sourceHashes = new Map();
+
+// Blob SHAs of source files as git would store them: { relPath -> sha }
+async function hashManifest(manifest, { write = false } = {}) {
+  const pending = [...new Set(manifest.values())].filter((source) => write || !sourceHashes.has(source));
+  if (pending.length > 0) {
+    const args = ['hash-object', ...(write ? ['-w'] : []), '--stdin-paths'];
+    const shas = (await runGit(args, { input: pending.join('\n') + '\n' })).trim().split('\n');
+    pending.forEach((source, i) => sourceHashes.set(source, shas[i]));
+  }
+  return new Map([...manifest].map(([relPath, source]) => [relPath, sourceHashes.get(source)]));
+}
+
+// Compare the merged manifest with the live branch tree
+function diffManifest(hashes, branchTree) {
+  const added = [];
+  const changed = [];
+  const deleted = [];
+  for (const [relPath, sha] of hashes) {
+    if (!branchTree.has(relPath)) {
+      added.push(relPath);
+    } else if (branchTree.get(relPath) !== sha) {
+      changed.push(relPath);
+    }
+  }
+  for (const relPath of branchTree.keys()) {
+    if (!hashes.has(relPath)) {
+      deleted.push(relPath);
+    }
+  }
+  return { added, changed, deleted };
+}
+
+// Git file mode for a source file: executable bit is kept like `git add` would
+async function fileMode(sourcePath) {
+  if (process.platform === 'win32') return '100644';
+  const stats = await fs.stat(sourcePath);
+  return (stats.mode & 0o111) ? '100755' : '100644';
+}
+
+// Escape a file name for use inside a RegExp
+function escapeRegExp(text) {
+  return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+// Name an asset is referenced by: Shopify renders X.css.liquid and serves it as X.css
+function servedAssetName(relPath) {
+  const name = relPath.slice('assets/'.length);
+  return name.endsWith('.liquid') ? name.slice(0, -'.liquid'.length) : name;
+}
+
+// Snippets and assets nothing in the deployed theme can reach. Every file
+// outside snippets/ and assets/ is a root (the theme editor can use any
+// section or template); snippets are reached through render/include, and
+// an asset through its served name appearing in any reachable text file,
+// delimited like a file name (so a.css doesn't match inside data.css, nor
+// foo.js inside foo.js.map).
+// Names built with `prepend: 'icon-'` keep every asset whose remaining
+// name is a setting value used in the templates, section groups, settings
+// data or a schema default.
+async function findUnreachable(manifest) {
+  const texts = new Map();
+  for (const [relPath, sourcePath] of manifest) {
+    if (TEXT_EXTENSIONS.has(path.extname(relPath))) {
+      texts.set(relPath, await fs.readFile(sourcePath, 'utf8'));
+    }
+  }
+  
+  const assets = [...manifest.keys()].filter((relPath) => relPath.startsWith('assets/'));
+  const assetByName = new Map(assets.map((relPath) => [servedAssetName(relPath), relPath]));
+  const longestFirst = [...assetByName.keys()].sort((a, b) => b.length - a.length);
+  const assetNames = new RegExp(`(?<![\\w.-])(?:${longestFirst.map(escapeRegExp).join('|')})(?![\\w.-])`, 'g');
+  
+  const values = new Set();
+  for (const [relPath, text] of texts) {
+    const pattern = DATA_FILES.test(relPath) ? DATA_VALUE : relPath.endsWith('.liquid') ? SCHEMA_DEFAULT : null;
+    if (!pattern) continue;
+    for (const match of text.matchAll(pattern)) {
+      values.add(match[1].replace(/_/g, '-'));
+    }
+  }
+  
+  const reachable = new Set([...manifest.keys()].filter(
+    (relPath) => !relPath.startsWith('snippets/') && !relPath.startsWith('assets/')));
+  const pending = [...reachable];
+  const reach = (relPath) => {
+    if (relPath && manifest.has(relPath) && !reachable.has(relPath)) {
+      reachable.add(relPath);
+      pending.push(relPath);
+    }
+  };
+  while (pending.length > 0) {
+    const text = texts.get(pending.pop());
+    if (text === undefined) continue;
+    for (const match of text.matchAll(SNIPPET_TAG)) {
+      reach(`snippets/${match[1]}.liquid`);
+    }
+    if (assetByName.size > 0) {
+      for (const match of text.matchAll(assetNames)) {
+        reach(assetByName.get(match[0]));
+      }
+    }
+    for (const match of text.matchAll(DYNAMIC_PREFIX)) {
+      for (const [name, relPath] of assetByName) {
+        const rest = name.startsWith(match[1]) ? name.slice(match[1].length) : null;
+        if (rest !== null && values.has(rest.slice(0, rest.length - path.extname(rest).length))) {
+          reach(relPath);
+        }
+      }
+    }
+  }
+  
+  return [...manifest.keys()]
+    .filter((relPath) => !reachable.has(relPath))
+    .sort();
+}
+
+// Copy a source file into the object store once per distinct content
+async function storeObject(sha, sourcePath) {
+  const objectPath = path.join(OBJECTS_DIR, sha.slice(0, 2), sha.slice(2));
+  if (await fs.pathExists(objectPath)) {
+    return { objectPath, created: false };
+  }
+  await fs.ensureDir(path.dirname(objectPath));
+  // Write under a unique name first; parallel stores may add the same
+  // object, and an object that is already published is never replaced
+  const tmpPath = `${objectPath}.${process.pid}.${Math.random().toString(36).slice(2)}.tmp`;
+  await fs.copyFile(sourcePath, tmpPath, constants.COPYFILE_FICLONE);
+  let created = true;
+  try {
+    await fs.link(tmpPath, objectPath);
+  } catch (error) {
+    if (error.code === 'EEXIST') {
+      created = false;
+    } else if (NO_LINK_ERRORS.has(error.code)) {
+      await fs.rename(tmpPath, objectPath);
+      return { objectPath, created };
+    } else {
+      throw error;
+    }
+  }
+  await fs.remove(tmpPath);
+  return { objectPath, created };
+}
+
+// Materialize the merged theme in ../temp-deploy/<store> from the object
+// store: hardlinks where possible, reflinks or plain copies otherwise
+async function stageStore(storeName, manifest, hashes, log) {
+  const storeDir = path.join(STAGE_DIR, storeName);
+  await fs.remove(storeDir);
+  
+  let newObjects = 0;
+  let newBytes = 0;
+  let copied = 0;
+  const dirs = new Set();
+  for (const [relPath, sourcePath] of manifest) {
+    const { objectPath, created } = await storeObject(hashes.get(relPath), sourcePath);
+    if (created) {
+      newObjects++;
+      newBytes += (await fs.stat(objectPath)).size;
+    }
+    
+    const target = path.join(storeDir, relPath);
+    const targetDir = path.dirname(target);
+    if (!dirs.has(targetDir)) {
+      await fs.ensureDir(targetDir);
+      dirs.add(targetDir);
+    }
+    try {
+      await fs.link(objectPath, target);
+    } catch (error) {
+      if (!NO_LINK_ERRORS.has(error.code)) throw error;
+      await fs.copyFile(objectPath, target, constants.COPYFILE_FICLONE);
+      copied++;
+    }
+  }
+  
+  log(`    Staged ${manifest.size} files in ${storeDir} ` +
+    `(${newObjects} new objects, ${(newBytes / 1024).toFixed(1)} KB; ${copied} copied instead of linked)`);
+}
+
+// Build the branch commit straight from git objects; the working tree,
+// the real index and the current branch are never touched
+async function deployStore(storeName, {
+  log = console.log, logError = console.error, stage = false, prune = false, pruneDryRun = false,
+  minify = false, optimize = false, bundleCss = false
+} = {}) {
   const branch = STORE_BRANCHES[storeName];
   if (!branch) {
     throw new Error(`Unknown store: ${storeName}`);
   }
 
-  console.log(`\n🚀 Deploying ${storeName} to branch ${branch}...`);
+  log(`\n🚀 Deploying ${storeName} to branch ${branch}...`);
   
   const themeDir = path.join('themes', storeName);
-  const sharedDir = 'shared';
-  const tempDir = path.join('..', 'temp-deploy', storeName);
+  const gitDir = (await runGit(['rev-parse', '--git-dir'])).trim();
+  const indexFile = path.resolve(gitDir, `deploy-${branch}.index`);
+  const env = { ...process.env, GIT_INDEX_FILE: indexFile };
   
   try {
     // Check if theme directory exists
@@ -33,124 +311,210 @@ async function deployStore(storeName) {
       throw new Error(`Theme directory not found: ${themeDir}`);
     }
     
-    // Step 1: Create temp directory with theme files
-    console.log('  📦 Preparing theme files...');
-    await fs.remove(tempDir);
-    await fs.ensureDir(tempDir);
-    
-    // Copy theme files to temp
-    const themeContents = await fs.readdir(themeDir);
-    for (const item of themeContents) {
-      await fs.copy(path.join(themeDir, item), path.join(tempDir, item));
+    // Step 1: Find the current branch commit (none for a new branch)
+    log(`  🌿 Checking branch ${branch}...`);
+    let parent = null;
+    try {
+      parent = (await runGit(['rev-parse', '--verify', '-q', `refs/heads/${branch}^{commit}`])).trim();
+      log(`    Branch ${branch} exists`);
+    } catch {
+      log(`    Branch ${branch} will be created`);
     }
     
-    // Copy shared files (if they exist)
-    if (await fs.pathExists(sharedDir)) {
-      const sharedContents = await fs.readdir(sharedDir);
-      if (sharedContents.length > 0) {
-        console.log('  🎨 Applying shared overrides...');
-        for (const item of sharedContents) {
-          await fs.copy(path.join(sharedDir, item), path.join(tempDir, item), { overwrite: true });
-        }
+    // Step 2: Compare theme + shared (shared wins) with the branch tree
+    const manifest = await buildManifest(storeName);
+    if (prune || pruneDryRun) {
+      log('  ✂️  Finding unreachable snippets and assets...');
+      const unreachable = await findUnreachable(manifest);
+      let bytes = 0;
+      for (const relPath of unreachable) {
+        bytes += (await fs.stat(manifest.get(relPath))).size;
       }
-    }
-    
-    // Step 2: Ensure branch exists
-    console.log(`  🌿 Checking branch ${branch}...`);
-    try {
-      await execPromise(`git rev-parse --verify ${branch}`);
-      console.log(`    Branch ${branch} exists`);
-    } catch {
-      console.log(`    Creating branch ${branch}...`);
-      // Create orphan branch (no history)
-      await execPromise(`git checkout --orphan ${branch}`);
-      // Remove all files from index
-      await execPromise('git rm -rf . 2>/dev/null || true');
-      // Clean working directory
-      const files = await fs.readdir('.');
-      for (const file of files) {
-        if (file !== '.git') {
-          await fs.remove(file);
+      log(`    ${unreachable.length} unreachable files (${(bytes / 1024).toFixed(1)} KB)`);
+      if (pruneDryRun) {
+        for (const relPath of unreachable) {
+          log(`      - ${relPath}`);
         }
+        log(`✅ Dry run for ${storeName}: nothing was committed.\n`);
+        return { storeName, branch, status: 'dry run', pruned: unreachable.length, prunedBytes: bytes };
+      }
+      for (const relPath of unreachable) {
+        manifest.delete(relPath);
       }
-      // Create initial commit
-      await fs.writeFile('README.md', `# ${storeName} Theme\n\nThis branch contains the deployed theme for ${storeName}.`);
-      await execPromise('git add README.md');
-      await execPromise(`git commit -m "Initial commit for ${branch}"`);
-      await execPromise('git checkout main');
     }
+    let hashes = await hashManifest(manifest);
+    if (bundleCss) {
+      // Before minifying, so the bundle is minified as one file
+      log('  📦 Bundling component stylesheets...');
+      const cacheDir = path.resolve(gitDir, 'deploy-cache', 'bundle');
+      const result = await bundleComponentCss(manifest, hashes, cacheDir, log);
+      log(`    ${result.bundled} stylesheets bundled, ${result.rewritten} Liquid files rewritten`);
+    }
+    if (minify) {
+      log('  🗜️  Minifying CSS and JS...');
+      const cacheDir = path.resolve(gitDir, 'deploy-cache', 'minify');
+      const result = await minifyManifest(manifest, hashes, cacheDir, log);
+      log(`    ${result.minified} minified, ${result.reused} from cache, ` +
+        `${(result.savedBytes / 1024).toFixed(1)} KB saved (css: ${result.tools.css}, js: ${result.tools.js || 'skipped'})`);
+    }
+    if (optimize) {
+      log('  🖼️  Optimizing PNG and SVG images...');
+      const cacheDir = path.resolve(gitDir, 'deploy-cache', 'images');
+      const result = await optimizeImages(manifest, hashes, cacheDir, log);
+      log(`    ${result.optimized} optimized, ${result.reused} from cache, ` +
+        `${(result.savedBytes / 1024).toFixed(1)} KB saved (png: ${result.tools.png}, svg: ${result.tools.svg})`);
+    }
+    if (bundleCss || minify || optimize) {
+      hashes = await hashManifest(manifest);
+    }
+    log('  🔍 Comparing theme + shared with the live branch...');
+    const branchTree = parent ? await readBranchTree(branch) : new Map();
+    const { added, changed, deleted } = diffManifest(hashes, branchTree);
+    log(`    ${added.length} added, ${changed.length} changed, ${deleted.length} deleted`);
     
-    // Step 3: Switch to branch
-    console.log(`  📝 Updating ${branch} branch...`);
-    await execPromise(`git checkout ${branch}`);
-    
-    // Step 4: Remove old files (except .git)
-    const branchFiles = await fs.readdir('.');
-    for (const file of branchFiles) {
-      if (file !== '.git') {
-        await fs.remove(file);
-      }
+    if (stage) {
+      log('  📂 Staging merged theme...');
+      await stageStore(storeName, manifest, hashes, log);
     }
     
-    // Step 5: Copy prepared files from temp
-    console.log('  📂 Copying theme to branch...');
-    const tempContents = await fs.readdir(tempDir);
-    for (const item of tempContents) {
-      await fs.copy(path.join(tempDir, item), item);
+    if (parent && added.length + changed.length + deleted.length === 0) {
+      log(`✅ ${storeName} is already up to date on ${branch}.\n`);
+      return { storeName, branch, status: 'up to date', added: 0, changed: 0, deleted: 0 };
     }
     
-    // Step 6: Commit changes
-    console.log('  💾 Committing changes...');
-    await execPromise('git add -A');
+    // Step 3: Store the new file contents as blobs
+    const updated = [...added, ...changed];
+    await hashManifest(new Map(updated.map((relPath) => [relPath, manifest.get(relPath)])), { write: true });
     
-    try {
-      const message = `Deploy ${storeName} theme - ${new Date().toISOString()}`;
-      await execPromise(`git commit -m "${message}"`);
-      console.log('    Changes committed');
-    } catch (error) {
-      if (error.message.includes('nothing to commit')) {
-        console.log('    No changes to commit');
-      } else {
-        throw error;
-      }
+    // Step 4: Apply the changes to a private index seeded from the branch
+    log('  📦 Building theme tree...');
+    await fs.remove(indexFile);
+    if (parent) {
+      await runGit(['read-tree', parent], { env });
     }
+    const entries = [];
+    for (const relPath of updated) {
+      entries.push(`${await fileMode(manifest.get(relPath))} ${hashes.get(relPath)}\t${relPath}`);
+    }
+    for (const relPath of deleted) {
+      entries.push(`0 ${ZERO_OID}\t${relPath}`);
+    }
+    await runGit(['update-index', '-z', '--index-info'], { env, input: entries.join('\0') + '\0' });
+    const tree = (await runGit(['write-tree'], { env })).trim();
     
-    // Step 7: Switch back to main
-    await execPromise('git checkout main');
-    
-    // Clean up temp directory
-    await fs.remove(tempDir);
+    // Step 5: Commit the tree and move the branch to it
+    log('  💾 Committing changes...');
+    const message = `Deploy ${storeName} theme - ${new Date().toISOString()}`;
+    const commitArgs = ['commit-tree', tree, ...(parent ? ['-p', parent] : []), '-m', message];
+    const commit = (await runGit(commitArgs)).trim();
+    await runGit(['update-ref', '-m', message, `refs/heads/${branch}`, commit, parent || ZERO_OID]);
+    log(`    Committed ${commit.slice(0, 7)}`);
     
-    console.log(`✅ Successfully deployed ${storeName}!`);
-    console.log(`   Branch ${branch} is ready.`);
-    console.log(`   Run 'git push origin ${branch}' to push to GitHub.\n`);
+    log(`✅ Successfully deployed ${storeName}!`);
+    log(`   Branch ${branch} is ready.`);
+    log(`   Run 'git push origin ${branch}' to push to GitHub.\n`);
+    return {
+      storeName, branch, status: 'deployed', commit,
+      added: added.length, changed: changed.length, deleted: deleted.length
+    };
     
   } catch (error) {
-    console.error(`❌ Error deploying ${storeName}:`, error.message);
-    // Try to switch back to main on error
-    try {
-      await execPromise('git checkout main');
-    } catch {}
-    // Clean up temp directory
-    try {
-      await fs.remove(tempDir);
-    } catch {}
+    logError(`❌ Error deploying ${storeName}:`, error.message);
     throw error;
+  } finally {
+    await fs.remove(indexFile);
+  }
+}
+
+// Logger that tags every line with the store it belongs to
+function storeLogger(storeName, write) {
+  return (...args) => {
+    const lines = args.join(' ').split('\n').filter((line) => line.trim());
+    for (const line of lines) {
+      write(`[${storeName}] ${line.trim()}`);
+    }
+  };
+}
+
+// Deploy every store at once; each one has its own private index
+async function deployAll(deployOptions = {}) {
+  const stores = Object.keys(STORE_BRANCHES);
+  console.log(`\n🚀 Deploying ${stores.length} stores in parallel...\n`);
+  const started = Date.now();
+  
+  // Hash the shared files once up front instead of once per store
+  if (await fs.pathExists('shared')) {
+    const sharedFiles = await listFiles('shared');
+    await hashManifest(new Map(sharedFiles.map((relPath) => [relPath, path.join('shared', relPath)])));
+  }
+  
+  const results = await Promise.all(stores.map(async (storeName) => {
+    const storeStarted = Date.now();
+    const options = {
+      log: storeLogger(storeName, console.log),
+      logError: storeLogger(storeName, console.error),
+      ...deployOptions
+    };
+    try {
+      const result = await deployStore(storeName, options);
+      return { ...result, seconds: (Date.now() - storeStarted) / 1000 };
+    } catch (error) {
+      return {
+        storeName, branch: STORE_BRANCHES[storeName], status: 'failed',
+        error: error.message, seconds: (Date.now() - storeStarted) / 1000
+      };
+    }
+  }));
+  
+  console.log(`\n📋 Deploy summary (${((Date.now() - started) / 1000).toFixed(1)}s total)`);
+  for (const result of results) {
+    const timing = `${result.seconds.toFixed(1)}s`;
+    if (result.status === 'failed') {
+      console.log(`  ❌ ${result.storeName} → ${result.branch}: failed (${result.error}) [${timing}]`);
+    } else if (result.status === 'up to date') {
+      console.log(`  ✅ ${result.storeName} → ${result.branch}: up to date [${timing}]`);
+    } else if (result.status === 'dry run') {
+      console.log(`  ✂️  ${result.storeName} → ${result.branch}: would prune ${result.pruned} files ` +
+        `(${(result.prunedBytes / 1024).toFixed(1)} KB) [${timing}]`);
+    } else {
+      console.log(`  ✅ ${result.storeName} → ${result.branch}: ${result.commit.slice(0, 7)} ` +
+        `(${result.added} added, ${result.changed} changed, ${result.deleted} deleted) [${timing}]`);
+    }
   }
+  
+  const failed = results.filter((result) => result.status === 'failed');
+  if (failed.length > 0) {
+    throw new Error(`${failed.length} of ${stores.length} stores failed`);
+  }
+  if (deployOptions.pruneDryRun) return;
+  console.log(`\n   Run 'git push origin ${stores.map((store) => STORE_BRANCHES[store]).join(' ')}' to push to GitHub.\n`);
 }
 
 // Main execution
 async function main() {
-  const storeName = process.argv[2];
+  const args = process.argv.slice(2);
+  const options = {
+    stage: args.includes('--stage'),
+    prune: args.includes('--prune'),
+    pruneDryRun: args.includes('--prune-dry-run'),
+    minify: args.includes('--minify'),
+    optimize: args.includes('--optimize-images'),
+    bundleCss: args.includes('--bundle-css')
+  };
+  const storeName = args.find((arg) => arg === '--all' || !arg.startsWith('--'));
   
   if (!storeName) {
-    console.error('Usage: node scripts/deploy.js <store-name>');
+    console.error('Usage: node scripts/deploy.js <store-name>|--all [--stage] [--prune|--prune-dry-run] [--bundle-css] [--minify] [--optimize-images]');
     console.error('Available stores:', Object.keys(STORE_BRANCHES).join(', '));
     process.exit(1);
   }
   
   try {
-    await deployStore(storeName);
+    if (storeName === '--all') {
+      await deployAll(options);
+    } else {
+      await deployStore(storeName, options);
+    }
   } catch (error) {
     console.error('Deployment failed:', error.message);
     process.exit(1);
@@ -0,0 +1,148 @@
+const fs = require('fs-extra');
+const path = require('path');
+
+// Optional minifiers: used when installed, skipped otherwise
+function tryRequire(name) {
+  try {
+    return require(name);
+  } catch {
+    return null;
+  }
+}
+
+function packageVersion(name) {
+  const pkg = tryRequire(`${name}/package.json`);
+  return pkg ? pkg.version : 'none';
+}
+
+const terser = tryRequire('terser');
+const CleanCSS = tryRequire('clean-css');
+
+// Part of every cache key, so a minifier upgrade invalidates old outputs
+const CSS_TOOL = CleanCSS ? `clean-css@${packageVersion('clean-css')}` : 'basic-css@1';
+const JS_TOOL = terser ? `terser@${packageVersion('terser')}` : null;
+
+// Theme files that are worth minifying (Liquid-processed assets are skipped)
+function minifierFor(relPath) {
+  if (!relPath.startsWith('assets/') || relPath.includes('.min.')) return null;
+  if (relPath.endsWith('.css')) return 'css';
+  if (relPath.endsWith('.js') && JS_TOOL) return 'js';
+  return null;
+}
+
+// Whitespace- and comment-only CSS minifier used without clean-css.
+// Strings are copied verbatim and a space is only dropped next to
+// characters where it can't change meaning.
+function basicMinifyCss(css) {
+  const tight = '{};,>';
+  let out = '';
+  let pendingSpace = false;
+  let i = 0;
+  while (i < css.length) {
+    const ch = css[i];
+    if (ch === '/' && css[i + 1] === '*') {
+      const end = css.indexOf('*/', i + 2);
+      i = end === -1 ? css.length : end + 2;
+      pendingSpace = true;
+      continue;
+    }
+    if (/\s/.test(ch)) {
+      pendingSpace = true;
+      i++;
+      continue;
+    }
+    if (pendingSpace) {
+      if (out && !tight.includes(out[out.length - 1]) && !tight.includes(ch)) out += ' ';
+      pendingSpace = false;
+    }
+    if (ch === '"' || ch === "'") {
+      let j = i + 1;
+      while (j < css.length && css[j] !== ch) {
+        j += css[j] === '\\' ? 2 : 1;
+      }
+      out += css.slice(i, j + 1);
+      i = j + 1;
+      continue;
+    }
+    out += ch;
+    i++;
+  }
+  return out;
+}
+
+async function minifyText(kind, text) {
+  if (kind === 'css') {
+    if (!CleanCSS) return basicMinifyCss(text);
+    const result = new CleanCSS({ level: 1 }).minify(text);
+    if (result.errors.length > 0) throw new Error(result.errors[0]);
+    return result.styles;
+  }
+  // Top-level names stay as they are: theme scripts share globals
+  const result = await terser.minify(text, { compress: true, mangle: true });
+  return result.code;
+}
+
+// Swap manifest sources for transformed copies. pick(relPath) returns
+// { tool, transform(buffer), allowLarger } or null; outputs are cached under
+// cacheDir by input blob SHA and tool, so an unchanged file is only processed
+// once, and outputs that aren't smaller (unless allowLarger) are remembered
+// and skipped.
+async function transformManifest(manifest, hashes, cacheDir, pick, log = console.log) {
+  let processed = 0;
+  let reused = 0;
+  let savedBytes = 0;
+  await fs.ensureDir(cacheDir);
+
+  for (const [relPath, sourcePath] of manifest) {
+    const step = pick(relPath);
+    if (!step) continue;
+
+    const cachePath = path.join(cacheDir, `${hashes.get(relPath)}-${step.tool}${path.extname(relPath)}`);
+    const skipPath = `${cachePath}.skip`;
+    if (await fs.pathExists(skipPath)) continue;
+
+    if (await fs.pathExists(cachePath)) {
+      reused++;
+    } else {
+      const input = await fs.readFile(sourcePath);
+      let output;
+      try {
+        output = await step.transform(input);
+      } catch (error) {
+        log(`    ⚠️  Could not process ${relPath}: ${error.message}`);
+        output = null;
+      }
+      if (output === null || output === undefined ||
+          (!step.allowLarger && Buffer.byteLength(output) >= input.length)) {
+        await fs.writeFile(skipPath, '');
+        continue;
+      }
+      const tmpPath = `${cachePath}.${process.pid}.${Math.random().toString(36).slice(2)}.tmp`;
+      await fs.writeFile(tmpPath, output);
+      await fs.rename(tmpPath, cachePath);
+      processed++;
+    }
+
+    savedBytes += (await fs.stat(sourcePath)).size - (await fs.stat(cachePath)).size;
+    manifest.set(relPath, cachePath);
+  }
+
+  return { processed, reused, savedBytes };
+}
+
+// Swap CSS/JS sources in the manifest for minified copies
+async function minifyManifest(manifest, hashes, cacheDir, log = console.log) {
+  const pick = (relPath) => {
+    const kind = minifierFor(relPath);
+    if (!kind) return null;
+    return {
+      tool: kind === 'css' ? CSS_TOOL : JS_TOOL,
+      transform: (input) => minifyText(kind, input.toString('utf8'))
+    };
+  };
+  const result = await transformManifest(manifest, hashes, cacheDir, pick, log);
+  return { minified: result.processed, reused: result.reused, savedBytes: result.savedBytes,
+    tools: { css: CSS_TOOL, js: JS_TOOL } };
+}
+
+module.exports = { minifyManifest, transformManifest, basicMinifyCss, tryRequire, packageVersion };
@@ -0,0 +1,117 @@
+const zlib = require('zlib');
+const { transformManifest, tryRequire, packageVersion } = require('./minify');
+
+// Optional SVG optimizer: used when installed, basic whitespace pass otherwise
+const svgo = tryRequire('svgo');
+
+const PNG_TOOL = 'png-zlib@1';
+const SVG_TOOL = svgo ? `svgo@${packageVersion('svgo')}` : 'basic-svg@1';
+
+const PNG_SIGNATURE = Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a]);
+// Text and timestamp chunks don't affect how the image is drawn
+const PNG_METADATA_CHUNKS = new Set(['tEXt', 'zTXt', 'iTXt', 'tIME']);
+// Whitespace inside these elements is significant
+const SVG_WHITESPACE_SENSITIVE = /<(text|script|pre|textarea)\b|xml:space/i;
+
+let crcTable = null;
+function crc32(buffer) {
+  if (zlib.crc32) return zlib.crc32(buffer);
+  if (!crcTable) {
+    crcTable = new Int32Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+      crcTable[n] = c;
+    }
+  }
+  let crc = -1;
+  for (const byte of buffer) crc = crcTable[(crc ^ byte) & 0xff] ^ (crc >>> 8);
+  return (crc ^ -1) >>> 0;
+}
+
+function pngChunk(type, data) {
+  const header = Buffer.alloc(8);
+  header.writeUInt32BE(data.length, 0);
+  header.write(type, 4, 'latin1');
+  const crc = Buffer.alloc(4);
+  crc.writeUInt32BE(crc32(Buffer.concat([header.subarray(4), data])), 0);
+  return Buffer.concat([header, data, crc]);
+}
+
+// Lossless PNG recompression: the image data is inflated and deflated
+// again at maximum compression, and text/timestamp chunks are dropped.
+// Pixels, palette and colour-space chunks are untouched.
+function recompressPng(input) {
+  if (input.length < 8 || !input.subarray(0, 8).equals(PNG_SIGNATURE)) return null;
+
+  const chunks = [];
+  const imageData = [];
+  let offset = 8;
+  while (offset + 12 <= input.length) {
+    const length = input.readUInt32BE(offset);
+    const type = input.toString('latin1', offset + 4, offset + 8);
+    const data = input.subarray(offset + 8, offset + 8 + length);
+    offset += 12 + length;
+    if (type === 'IDAT') {
+      if (imageData.length === 0) chunks.push({ type });
+      imageData.push(data);
+    } else if (!PNG_METADATA_CHUNKS.has(type)) {
+      chunks.push({ type, data });
+    }
+    if (type === 'IEND') break;
+  }
+  if (imageData.length === 0) return null;
+
+  const raw = zlib.inflateSync(Buffer.concat(imageData));
+  const candidates = [zlib.constants.Z_DEFAULT_STRATEGY, zlib.constants.Z_FILTERED].map((strategy) =>
+    zlib.deflateSync(raw, { level: 9, memLevel: 9, strategy }));
+  const compressed = candidates.reduce((best, candidate) => (candidate.length < best.length ? candidate : best));
+
+  return Buffer.concat([
+    PNG_SIGNATURE,
+    ...chunks.map((chunk) => pngChunk(chunk.type, chunk.type === 'IDAT' ? compressed : chunk.data))
+  ]);
+}
+
+// Comments and whitespace between tags only; files where whitespace matters are skipped
+function basicMinifySvg(text) {
+  if (SVG_WHITESPACE_SENSITIVE.test(text)) return null;
+  return text
+    .replace(/<!--[\s\S]*?-->/g, '')
+    .replace(/\s+/g, ' ')
+    .replace(/>\s+</g, '><')
+    .trim();
+}
+
+function optimizeSvg(text) {
+  if (!svgo) return basicMinifySvg(text);
+  // Keep viewBox (icons are sized by CSS) and ids (referenced from markup)
+  return svgo.optimize(text, {
+    multipass: true,
+    plugins: [{
+      name: 'preset-default',
+      params: { overrides: { removeViewBox: false, cleanupIds: false } }
+    }]
+  }).data;
+}
+
+function imageStep(relPath) {
+  if (!relPath.startsWith('assets/')) return null;
+  const lower = relPath.toLowerCase();
+  if (lower.endsWith('.png')) {
+    return { tool: PNG_TOOL, transform: recompressPng };
+  }
+  if (lower.endsWith('.svg')) {
+    return { tool: SVG_TOOL, transform: (input) => optimizeSvg(input.toString('utf8')) };
+  }
+  return null;
+}
+
+// Swap PNG/SVG sources in the manifest for optimized copies
+async function optimizeImages(manifest, hashes, cacheDir, log = console.log) {
+  const result = await transformManifest(manifest, hashes, cacheDir, imageStep, log);
+  return { optimized: result.processed, reused: result.reused, savedBytes: result.savedBytes,
+    tools: { png: PNG_TOOL, svg: SVG_TOOL } };
+}
+
+module.exports = { optimizeImages, recompressPng, basicMinifySvg };